@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+
+"""
+Analytics
+This script summarizes results of many games: score and round percentiles,
+rates of reaching tiles (256, 512, ..., 2048, 4096, ...) and survival curves
+(share of games which lasted at least n rounds), per policy.
+
+Input files are results of runner.py (JSON Lines) or journals (see
+journal.py). They are read as stream, so memory does not depend on size of
+input: distributions are kept in mergeable sketches (quantile sketch with
+logarithmic buckets, counts per tile). Large result files are split into
+byte ranges which are read by worker processes; their partial summaries
+are merged.
+
+    python analytics.py results.jsonl [more.jsonl session.journal ...]
+                        [--workers 4] [--json]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import math
+import os
+import sys
+
+CHUNK_SIZE = 1 << 20 # read buffer (bytes)
+RANGE_SIZE = 1 << 26 # result files are split into ranges of 64 MB
+ACCURACY   = 0.01    # relative error of quantiles
+
+PERCENTILES    = [1, 10, 25, 50, 75, 90, 99]
+SURVIVAL_STEPS = 10  # points of survival curve
+
+JOURNAL_MAGIC = b"2048JRNL" # see journal.py (not imported by workers of
+                            # result files)
+
+
+class QuantileSketch:
+    """
+    Distribution of non-negative numbers. Numbers are counted in buckets of
+    logarithmic width, so every quantile has a relative error of at most
+    accuracy and memory depends on range of numbers, not on their count.
+    Sketches with same accuracy can be merged.
+    """
+    def __init__(self, accuracy=ACCURACY):
+        self.accuracy = accuracy
+        self.gamma    = (1 + accuracy) / (1 - accuracy)
+        self.logGamma = math.log(self.gamma)
+        self.buckets  = {} # bucket i counts numbers in (gamma**(i-1), gamma**i]
+        self.zeros    = 0
+        self.count    = 0
+        self.total    = 0
+        self.min      = None
+        self.max      = None
+
+    def add(self, value, count=1):
+        if(value <= 0):
+            self.zeros += count
+        else:
+            i = math.ceil(math.log(value) / self.logGamma)
+            self.buckets[i] = self.buckets.get(i, 0) + count
+        self.count += count
+        self.total += value * count
+        if(self.min is None or value < self.min): self.min = value
+        if(self.max is None or value > self.max): self.max = value
+
+    def merge(self, other):
+        if(other.accuracy != self.accuracy):
+            raise ValueError("sketches have different accuracy")
+        for i, count in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if(value is None): continue
+            if(self.min is None or value < self.min): self.min = value
+            if(self.max is None or value > self.max): self.max = value
+
+    def value(self, i):
+        """
+        This function returns representative value of bucket i.
+        """
+        return 2 * self.gamma**i / (self.gamma + 1)
+
+    def percentile(self, p):
+        """
+        This function returns the value which p percent of numbers do not
+        exceed (relative error at most accuracy).
+        """
+        if(self.count == 0): return 0
+        limit = p / 100 * self.count
+        seen  = self.zeros
+        if(seen and seen >= limit): return 0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if(seen >= limit):
+                return min(max(self.value(i), self.min), self.max)
+        return self.max
+
+    def countAbove(self, value):
+        """
+        This function returns (approximately) how many numbers are at least
+        passed value.
+        """
+        if(value <= 0): return self.count
+        limit = math.ceil(math.log(value) / self.logGamma)
+        return sum(count for i, count in self.buckets.items() if i >= limit)
+
+
+class Summary:
+    """
+    Statistics of many games (of one policy), mergeable.
+    """
+    def __init__(self):
+        self.games  = 0
+        self.scores = QuantileSketch()
+        self.rounds = QuantileSketch()
+        self.tiles  = {} # exponent of largest tile -> games
+
+    def add(self, score, round, maxTile):
+        self.games += 1
+        self.scores.add(score)
+        self.rounds.add(round)
+        exponent = max(maxTile, 1).bit_length() - 1
+        self.tiles[exponent] = self.tiles.get(exponent, 0) + 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.scores.merge(other.scores)
+        self.rounds.merge(other.rounds)
+        for exponent, count in other.tiles.items():
+            self.tiles[exponent] = self.tiles.get(exponent, 0) + count
+
+    def reachRates(self):
+        """
+        This function returns {tile: share of games which reached tile} for
+        all tiles which have been reached.
+        """
+        rates   = {}
+        reached = 0
+        for exponent in sorted(self.tiles, reverse=True):
+            reached += self.tiles[exponent]
+            rates[1 << exponent] = reached / self.games
+        return dict(sorted(rates.items()))
+
+    def survival(self, steps=SURVIVAL_STEPS):
+        """
+        This function returns [(rounds, share of games which lasted at least
+        rounds), ...] for evenly spaced numbers of rounds up to the longest
+        game.
+        """
+        if(self.games == 0): return []
+        longest = self.rounds.max
+        step    = max(1, math.ceil(longest / steps))
+        return [(rounds, self.rounds.countAbove(rounds) / self.games)
+                for rounds in range(step, longest + step, step)]
+
+    def toDict(self):
+        return {"games":       self.games,
+                "meanScore":   self.scores.total / self.games if self.games else 0,
+                "maxScore":    self.scores.max or 0,
+                "score":       {p: round(self.scores.percentile(p))
+                                for p in PERCENTILES},
+                "rounds":      {p: round(self.rounds.percentile(p))
+                                for p in PERCENTILES},
+                "reached":     self.reachRates(),
+                "survival":    self.survival()}
+
+    def report(self):
+        """
+        This function returns the summary as text.
+        """
+        if(self.games == 0): return "no games"
+        lines = ["games %d  mean score %.0f  max score %d"
+                 % (self.games, self.scores.total / self.games, self.scores.max)]
+        lines.append("  score   " + "  ".join("p%d %.0f" % (p, self.scores.percentile(p))
+                                              for p in PERCENTILES))
+        lines.append("  rounds  " + "  ".join("p%d %.0f" % (p, self.rounds.percentile(p))
+                                              for p in PERCENTILES))
+        lines.append("  reached " + "  ".join("%d %.2f%%" % (tile, 100 * rate)
+                                              for tile, rate in self.reachRates().items()
+                                              if tile >= 64))
+        lines.append("  survival (rounds: games left) " +
+                     "  ".join("%d: %.1f%%" % (rounds, 100 * share)
+                               for rounds, share in self.survival()))
+        return "\n".join(lines)
+
+
+def readLines(filename, start=0, end=None):
+    """
+    This generator yields all lines (bytes) of a file which begin within
+    byte range [start, end). Ranges of a file can be read independently.
+    """
+    with open(filename, "rb", buffering=CHUNK_SIZE) as f:
+        position = start
+        if(start > 0):
+            # skip line which begins in previous range
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+        while(end is None or position < end):
+            line = f.readline()
+            if(not line): break
+            position += len(line)
+            yield line
+
+
+def analyzeResults(filename, start=0, end=None):
+    """
+    This function summarizes game results (JSON Lines of runner.py) in a
+    byte range of a file and returns ({policy: Summary}, invalid lines).
+    """
+    summaries = {}
+    invalid   = 0
+    for line in readLines(filename, start, end):
+        if(not line.strip()): continue
+        try:
+            result = json.loads(line)
+            policy = result.get("policy")
+            record = (int(result["score"]), int(result["round"]),
+                      int(result["maxTile"]))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            invalid += 1
+            continue
+        summary = summaries.get(policy)
+        if(summary is None):
+            summary = summaries[policy] = Summary()
+        summary.add(*record)
+    return summaries, invalid
+
+
+def analyzeJournal(filename):
+    """
+    This function summarizes all games recorded in a journal and returns
+    ({"journal": Summary}, 0).
+    """
+    from journal import Replay
+    summary = Summary()
+    with Replay(filename) as replay:
+        for field, score, round in replay.games():
+            summary.add(score, round, max(max(row) for row in field))
+    return {"journal": summary}, 0
+
+
+def isJournal(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(JOURNAL_MAGIC)) == JOURNAL_MAGIC
+
+
+def analyze(filenames, workers=None, rangeSize=RANGE_SIZE):
+    """
+    This function summarizes all files in a process pool (one task per
+    journal or byte range of a result file) and returns ({policy: Summary},
+    invalid lines).
+    """
+    tasks = []
+    for filename in filenames:
+        if(isJournal(filename)):
+            tasks.append((analyzeJournal, filename))
+            continue
+        size = os.path.getsize(filename)
+        for start in range(0, max(size, 1), rangeSize):
+            tasks.append((analyzeResults, filename, start, start + rangeSize))
+
+    summaries = {}
+    invalid   = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(*task) for task in tasks]
+        for future in futures:
+            partial, count = future.result()
+            invalid += count
+            for policy, summary in partial.items():
+                if(policy in summaries):
+                    summaries[policy].merge(summary)
+                else:
+                    summaries[policy] = summary
+    return summaries, invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize results of many games of 2048.")
+    parser.add_argument("files", nargs="+",
+                        help="results of runner.py (JSON Lines) or journals")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", action="store_true",
+                        help="print summary as JSON")
+    args = parser.parse_args()
+
+    summaries, invalid = analyze(args.files, args.workers)
+    if(args.json):
+        print(json.dumps({str(policy): summary.toDict()
+                          for policy, summary in sorted(summaries.items(),
+                                                        key=lambda item: str(item[0]))}))
+    else:
+        for policy, summary in sorted(summaries.items(),
+                                      key=lambda item: str(item[0])):
+            print("policy %s: %s" % (policy, summary.report()))
+    if(invalid):
+        print("%d invalid lines skipped" % invalid, file=sys.stderr)
+
+
+if(__name__ == "__main__"):
+    main()
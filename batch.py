@@ -0,0 +1,174 @@
+"""
+Class BatchGame
+This class implements many games at once using NumPy. All boards are kept in
+one contiguous array of tile exponents (shape N x n x n, 0 = empty field,
+1 = 2, 2 = 4, ...). Every function works on all boards with a constant number
+of NumPy calls, so cost per board shrinks with growing batch size.
+
+Moves and merges follow the same rules as class Game, new tiles are 2 or 4
+(using probability4) at a random empty field.
+
+ - move(directions)
+    0 - move north / up
+    1 - move east  / right
+    2 - move south / down
+    3 - move west  / left
+ - newGame()
+ - isFinished()
+ - getField(i)
+"""
+
+import numpy as np
+
+
+class BatchGame:
+    def __init__(self, size, probability4=10, seed=None, boardSize=4):
+        # number of boards
+        self.size = size
+
+        # number of rows and columns of every board
+        self.boardSize = boardSize
+
+        # define probability of fours when random numbers appear (in percent)
+        self.probability4 = probability4
+
+        # every batch uses its own random number generator
+        self.rng = np.random.default_rng(seed)
+
+        # initialize new games
+        self.newGame()
+
+    def newGame(self):
+        """
+        This function resets all boards, scores and rounds and inserts two
+        random numbers on every board.
+        """
+        n = self.boardSize
+        self.boards = np.zeros((self.size, n, n), dtype=np.uint8)
+        self.score  = np.zeros(self.size, dtype=np.int64)
+        self.round  = np.zeros(self.size, dtype=np.int64)
+
+        self.insertRandomNumbers()
+        self.insertRandomNumbers()
+
+    def move(self, directions):
+        """
+        This function moves and merges the tiles on every board in its
+        direction (scalar or array with one direction per board).
+        Boards that changed get a new random number and their round is
+        incremented.
+        It returns three arrays: gained score, moved flags, finished flags.
+        """
+        directions = np.broadcast_to(np.asarray(directions), (self.size,))
+        gained = np.zeros(self.size, dtype=np.int64)
+        moved  = np.zeros(self.size, dtype=bool)
+
+        for direction in range(4):
+            ix = np.flatnonzero(directions == direction)
+            if(len(ix) == 0): continue
+
+            # rotate boards so that every move is a move to west
+            old = self.boards[ix]
+            new, score = self.__move_west(self.__toWest(old, direction))
+            new = self.__fromWest(new, direction)
+
+            self.boards[ix] = new
+            gained[ix] = score
+            moved[ix]  = (new != old).any(axis=(1, 2))
+
+        self.score += gained
+        self.round += moved
+        self.insertRandomNumbers(moved)
+
+        return gained, moved, self.isFinished()
+
+    @staticmethod
+    def __toWest(boards, direction):
+        if(direction == 0): return boards.transpose(0, 2, 1)
+        if(direction == 1): return boards[:, :, ::-1]
+        if(direction == 2): return boards.transpose(0, 2, 1)[:, :, ::-1]
+        return boards
+
+    @staticmethod
+    def __fromWest(boards, direction):
+        if(direction == 0): return boards.transpose(0, 2, 1)
+        if(direction == 1): return boards[:, :, ::-1]
+        if(direction == 2): return boards[:, :, ::-1].transpose(0, 2, 1)
+        return boards
+
+    @staticmethod
+    def __compress(rows):
+        """
+        This function moves all numbers of every row to the left (stable, so
+        order of numbers is kept).
+        """
+        order = np.argsort(rows == 0, axis=1, kind="stable")
+        return np.take_along_axis(rows, order, axis=1)
+
+    def __move_west(self, boards):
+        """
+        This function moves and merges all rows of passed boards to the left.
+        It returns new boards and gained score per board.
+        """
+        n      = self.boardSize
+        rows   = self.__compress(boards.reshape(-1, n))
+        gained = np.zeros(len(rows), dtype=np.int64)
+
+        # merge from left to right, a merged tile leaves a gap behind itself
+        # so it can not be merged twice (same as in Game)
+        for i in range(n-1):
+            left  = rows[:, i]
+            right = rows[:, i+1]
+            merge = (left != 0) & (left == right)
+            left[merge]  += 1
+            right[merge]  = 0
+            gained += np.where(merge, np.left_shift(1, left.astype(np.int64)), 0)
+
+        rows = self.__compress(rows)
+        return rows.reshape(boards.shape), gained.reshape(-1, n).sum(axis=1)
+
+    def insertRandomNumbers(self, mask=None):
+        """
+        This function inserts 2 or 4 at a random empty field on every board
+        (or only on boards selected by boolean array mask). Every empty field
+        has the same chance.
+        """
+        cells  = self.boardSize * self.boardSize
+        fields = self.boards.reshape(self.size, cells)
+        empty  = fields == 0
+        if(mask is not None):
+            empty &= mask[:, None]
+
+        # the empty field with highest random key is chosen
+        keys = self.rng.random((self.size, cells))
+        keys[~empty] = -1
+        cells = keys.argmax(axis=1)
+
+        fours = self.rng.integers(1, 101, size=self.size) <= self.probability4
+        ix = np.flatnonzero(empty.any(axis=1))
+        fields[ix, cells[ix]] = np.where(fours[ix], 2, 1)
+
+    def getNumNullValues(self):
+        """
+        This function returns number of empty fields per board.
+        """
+        return (self.boards == 0).sum(axis=(1, 2))
+
+    def isFinished(self):
+        """
+        This function returns per board whether game is finished (no empty
+        field and no adjacent fields with same values).
+        """
+        b = self.boards
+        full       = (b != 0).all(axis=(1, 2))
+        horizontal = (b[:, :, :-1] == b[:, :, 1:]).any(axis=(1, 2))
+        vertical   = (b[:, :-1, :] == b[:, 1:, :]).any(axis=(1, 2))
+        return full & ~horizontal & ~vertical
+
+    def getField(self, i):
+        """
+        This function returns board i as field (list of lists of numbers) like
+        Game.field.
+        """
+        return [[(1 << int(e)) if e else 0 for e in row]
+                for row in self.boards[i]]
@@ -0,0 +1,411 @@
+#!/usr/bin/python3
+
+"""
+Benchmarks
+This script measures hot paths of game and UI with fixed seeds:
+
+ - moves per second for every direction (list and bitboard engine) on a
+   corpus of boards taken from played games (boards are restored outside
+   of the timed calls, Game.setField is measured on its own)
+ - fields per second moved on larger boards (5x5 to 8x8)
+ - cost of inserting a random number
+ - complete games per second (random moves)
+ - memory per Game instance (new and after 50 random moves)
+ - latency of UI.show() and UI.setWindowSize() (tkinter is replaced by a
+   stub, so no display is needed)
+
+The whole suite is run several times (--runs), every metric is the median of
+all runs and its spread (slowest to fastest run relative to median) is
+reported as well. Results are written as JSON and compared with a baseline;
+metrics which are worse than baseline by more than threshold are reported as
+regressions. Noisy metrics get a larger threshold (NOISE_FACTOR times their
+spread in results or baseline), UI timings below UI_GATE_MINIMUM are only
+reported, as they differ too much between identical runs.
+
+    python benchmark.py [--output results.json] [--baseline FILE]
+                        [--threshold 0.2] [--runs 3] [--save-baseline]
+                        [--quick]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+
+import bitboard
+from game import Game
+from randomstream import RandomStream
+
+FILENAME_BASELINE = "benchmark_baseline.json"
+THRESHOLD         = 0.2 # 20 percent
+NOISE_FACTOR      = 1   # threshold of a metric is at least its spread
+RUNS              = 3   # runs of the whole suite
+UI_GATE_MINIMUM   = 50  # us, faster UI timings are not compared
+SEED              = 2048
+DIRECTIONS        = ["north", "east", "south", "west"]
+
+
+def measure(function, repeat=5):
+    """
+    This function calls function repeat times and returns the median time
+    (seconds) and the spread of all times (slowest minus fastest relative
+    to fastest).
+    """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), (max(times) - min(times)) / min(times)
+
+
+def metric(value, unit, better, spread=0.0, gate=True):
+    """
+    This function returns the result of one metric as stored in JSON.
+    Metrics with gate=False are not compared with baseline.
+    """
+    return {"value": value, "unit": unit, "better": better, "spread": spread,
+            "gate": gate}
+
+
+def prepareBoards(game, corpus):
+    """
+    This function returns (board, empty mask) of game for every field of
+    corpus, so the boards can be restored without Game.setField.
+    """
+    boards = []
+    for field in corpus:
+        game.setField(field)
+        boards.append((game.board, game.emptyMask))
+    return boards
+
+
+def buildCorpus(count, size=4):
+    """
+    This function plays games with random moves (fixed seed) and returns
+    fields of every 3rd round, so boards of early and late game are mixed.
+    """
+    rng    = RandomStream(SEED)
+    corpus = []
+    while(len(corpus) < count):
+        game = Game(useBitboard=True, rng=RandomStream(rng.next64()),
+                    size=size)
+        while(not game.isFinished() and len(corpus) < count):
+            game.move(rng.randrange(4))
+            if(game.round % 3 == 0):
+                corpus.append([row[:] for row in game.field])
+    return corpus
+
+
+def benchmarkMoves(results, corpus, repeat):
+    for useBitboard in [False, True]:
+        engine = "bitboard" if useBitboard else "list"
+        game   = Game(useBitboard=useBitboard, rng=RandomStream(SEED))
+        boards = prepareBoards(game, corpus)
+        for direction, name in enumerate(DIRECTIONS):
+            def run():
+                for board, emptyMask in boards:
+                    game.board, game.emptyMask = board, emptyMask
+                    game.legal = None
+                    game.move(direction)
+            seconds, spread = measure(run, repeat)
+            results["move.%s.%s" % (engine, name)] = metric(
+                len(corpus) / seconds, "moves/s", "higher", spread)
+
+        def run():
+            for field in corpus:
+                game.setField(field)
+        seconds, spread = measure(run, repeat)
+        results["setField.%s" % engine] = metric(
+            len(corpus) / seconds, "calls/s", "higher", spread)
+
+    # a single pass over the corpus is too short to be measured reliably
+    boards = [bitboard.fromField(field) for field in corpus] * 10
+    for direction, name in enumerate(DIRECTIONS):
+        def run():
+            for board in boards:
+                bitboard.move(board, direction)
+        seconds, spread = measure(run, repeat)
+        results["bitboard.move.%s" % name] = metric(
+            len(boards) / seconds, "moves/s", "higher", spread)
+
+
+def benchmarkSizes(results, count, repeat):
+    for size in [4, 5, 6, 8]:
+        corpus = buildCorpus(count, size)
+        game   = Game(rng=RandomStream(SEED), size=size)
+        boards = prepareBoards(game, corpus)
+        def run():
+            for direction in range(4):
+                for board, emptyMask in boards:
+                    game.board, game.emptyMask = board, emptyMask
+                    game.legal = None
+                    game.move(direction)
+        seconds, spread = measure(run, repeat)
+        results["move.list.%dx%d" % (size, size)] = metric(
+            4 * len(corpus) * size * size / seconds, "fields/s", "higher",
+            spread)
+
+
+def benchmarkSpawn(results, corpus, repeat):
+    game   = Game(rng=RandomStream(SEED))
+    fields = [field for field in corpus if any(0 in row for row in field)]
+    boards = prepareBoards(game, fields)
+    def run():
+        for board, emptyMask in boards:
+            game.board, game.emptyMask = board, emptyMask
+            game.insertRandomNumber()
+    seconds, spread = measure(run, repeat)
+    results["insertRandomNumber"] = metric(
+        seconds / len(fields) * 1e6, "us/call", "lower", spread)
+
+
+def benchmarkGames(results, games, repeat):
+    for useBitboard in [False, True]:
+        engine = "bitboard" if useBitboard else "list"
+        def run():
+            rng = RandomStream(SEED)
+            for i in range(games):
+                game = Game(useBitboard=useBitboard,
+                            rng=RandomStream(rng.next64()))
+                while(not game.isFinished()):
+                    game.move(rng.randrange(4))
+        seconds, spread = measure(run, repeat)
+        results["games.random.%s" % engine] = metric(
+            games / seconds, "games/s", "higher", spread)
+
+
+def benchmarkMemory(results, count):
+    Game(rng=RandomStream(SEED)) # load modules and score store before
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games  = [Game(rng=RandomStream(i)) for i in range(count)]
+    after  = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    results["memory.game"] = metric(size / len(games), "bytes/game", "lower")
+
+    # played games (with undo history)
+    rng = RandomStream(SEED)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games  = [Game(rng=RandomStream(i)) for i in range(count)]
+    for game in games:
+        for i in range(50):
+            if(game.isFinished()): break
+            game.move(rng.randrange(4))
+    after  = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    results["memory.game.played"] = metric(size / len(games), "bytes/game",
+                                           "lower")
+
+
+def stubTkinter():
+    """
+    This function installs a minimal tkinter stub (widgets only store their
+    options), so UI can be created without display.
+    """
+    class Widget:
+        def __init__(self, master=None, **options):
+            self.options = options
+        def config(self, **options):
+            self.options.update(options)
+        configure = config
+        def __setitem__(self, key, value):
+            self.options[key] = value
+        def __getitem__(self, key):
+            return self.options.get(key)
+        def place(self, **options):
+            self.options["place"] = options
+        def place_forget(self):
+            self.options.pop("place", None)
+        def bind(self, *args):
+            pass
+
+    class Tk(Widget):
+        windowState = "normal"
+        def title(self, title): pass
+        def winfo_screenwidth(self): return 1920
+        def winfo_screenheight(self): return 1080
+        def winfo_width(self): return 740
+        def state(self, state=None):
+            if(state is None): return self.windowState
+            self.windowState = state
+        def geometry(self, size): pass
+        def update(self): pass
+        def protocol(self, *args): pass
+        def mainloop(self): pass
+        def destroy(self): pass
+        def after(self, ms, function, *args): return "after"
+        def after_idle(self, function, *args): return "after"
+        def after_cancel(self, job): pass
+
+    class Canvas(Widget):
+        def __init__(self, master=None, **options):
+            super().__init__(master, **options)
+            self.items = 0
+        def create_rectangle(self, *args, **options):
+            self.items += 1
+            return self.items
+        create_text = create_rectangle
+        def coords(self, item, *args): pass
+        def itemconfig(self, item, **options): pass
+
+    class Font:
+        def __init__(self, **options): pass
+
+    tkinter = types.ModuleType("tkinter")
+    tkinter.Tk, tkinter.Label, tkinter.Canvas = Tk, Widget, Canvas
+    tkinter.CENTER, tkinter.RIDGE = "center", "ridge"
+    tkinter.__all__ = ["Tk", "Label", "Canvas", "CENTER", "RIDGE"]
+    tkinter.messagebox = types.ModuleType("tkinter.messagebox")
+    tkinter.messagebox.askyesno = lambda *args: True
+    tkinter.filedialog = types.ModuleType("tkinter.filedialog")
+    tkinter.font = types.ModuleType("tkinter.font")
+    tkinter.font.Font = Font
+    sys.modules["tkinter"] = tkinter
+    for name in ["messagebox", "filedialog", "font"]:
+        sys.modules["tkinter." + name] = getattr(tkinter, name)
+
+
+def benchmarkUI(results, frames, repeat):
+    stubTkinter()
+    import ui
+    gui = ui.UI()
+    gui.game = Game(useBitboard=True, rng=RandomStream(SEED))
+    gui.resetRenderedState()
+
+    rng = RandomStream(SEED)
+    def run():
+        for i in range(frames):
+            if(gui.game.isFinished()): gui.game.newGame()
+            gui.game.move(rng.randrange(4))
+            gui.show()
+    seconds, spread = measure(run, repeat)
+    value = seconds / frames * 1e6
+    results["ui.show"] = metric(value, "us/frame", "lower", spread,
+                                value >= UI_GATE_MINIMUM)
+
+    widths = [ui.DEFAULT_WIDTH_WINDOW + ui.GRID_COLUMNS * (i % 10)
+              for i in range(frames)]
+    def run():
+        for width in widths:
+            gui.setWindowSize(width)
+    seconds, spread = measure(run, repeat)
+    value = seconds / frames * 1e6
+    results["ui.setWindowSize"] = metric(value, "us/call", "lower", spread,
+                                         value >= UI_GATE_MINIMUM)
+
+
+def runBenchmarks(quick=False, runs=RUNS):
+    """
+    This function runs all benchmarks runs times and returns results as
+    dictionary {name: {"value", "unit", "better", "spread", "gate"}}.
+    Value is the median of all runs. Spread is the larger one of the spread
+    between runs and the median spread within a run.
+    """
+    repeat = 3 if quick else 5
+    scale  = 1 if quick else 5
+    bitboard.buildTables()
+    corpus = buildCorpus(1000 * scale)
+
+    samples = []
+    for i in range(runs):
+        results = {}
+        benchmarkMoves(results, corpus, repeat)
+        benchmarkSizes(results, 500 * scale, repeat)
+        benchmarkSpawn(results, corpus, repeat)
+        benchmarkGames(results, 20 * scale, repeat)
+        benchmarkMemory(results, 1000)
+        benchmarkUI(results, 200 * scale, repeat)
+        samples.append(results)
+
+    results = {}
+    for name, result in samples[0].items():
+        values = [sample[name]["value"] for sample in samples]
+        spread = (max(values) - min(values)) / min(values) if min(values) else 0.0
+        spread = max(spread, statistics.median(sample[name]["spread"]
+                                               for sample in samples))
+        results[name] = metric(statistics.median(values), result["unit"],
+                               result["better"], spread,
+                               all(sample[name]["gate"] for sample in samples))
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    This function returns list of regressions (name, value, baseline value,
+    relative change) of results compared to baseline. Threshold of a metric
+    is raised to NOISE_FACTOR times its spread (of results or baseline).
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if(name not in baseline or not result.get("gate", True)): continue
+        old = baseline[name]["value"]
+        new = result["value"]
+        if(old == 0): continue
+        change  = (new - old) / old
+        spread  = max(result.get("spread", 0.0),
+                      baseline[name].get("spread", 0.0))
+        allowed = max(threshold, NOISE_FACTOR * spread)
+        if(result["better"] == "higher"):
+            worse = change < -allowed
+        else:
+            worse = change > allowed
+        if(worse):
+            regressions.append((name, new, old, change))
+    return regressions
+
+
+def main():
+    pathDir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Benchmarks of 2048.")
+    parser.add_argument("--output", help="write results as JSON to file")
+    parser.add_argument("--baseline", default=os.path.join(pathDir, FILENAME_BASELINE))
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed relative change (default: 0.2)")
+    parser.add_argument("--runs", type=int, default=RUNS,
+                        help="runs of all benchmarks (default: 3)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store results as new baseline")
+    parser.add_argument("--quick", action="store_true",
+                        help="smaller corpus and fewer repetitions")
+    args = parser.parse_args()
+
+    results = runBenchmarks(args.quick, args.runs)
+
+    try:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    for name, result in sorted(results.items()):
+        old = baseline.get(name)
+        print("%-28s %14.2f %-10s spread %3.0f%% %s" % (
+            name, result["value"], result["unit"], 100*result["spread"],
+            "(baseline %.2f)" % old["value"] if old else ""))
+
+    if(args.output):
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if(args.save_baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, new, old, change in regressions:
+        print("REGRESSION %s: %.2f -> %.2f (%+.0f%%)"
+              % (name, old, new, 100*change))
+    return 1 if regressions else 0
+
+
+if(__name__ == "__main__"):
+    sys.exit(main())
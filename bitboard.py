@@ -0,0 +1,281 @@
+"""
+Bitboard engine
+This module implements moves on a board which is stored as one 64-bit
+integer. Every tile is stored as its exponent (0 for an empty tile, 1 for 2,
+2 for 4, ...) in 4 bits. Tile (y, x) is located at bit 16*y + 4*x, so every
+row of the field is one 16-bit number.
+
+All possible rows are precomputed once (65536 entries per table), so a move
+is four table lookups instead of building lists. Results are identical to the
+moves implemented in class Game.
+
+Exponents are limited to 4 bits, so boards containing a tile of 32768 or
+more can not be represented (fromField raises an OverflowError). Two tiles
+of 16384 can still be merged, a merge of two tiles of 32768 would need 5 bits
+(move raises an OverflowError).
+
+Empty fields can be described by a 16-bit mask as well (bit 4*y + x is set
+when field (y, x) is empty), see emptyMask() and selectBit().
+Possible moves are described by a 4-bit mask (bit d is set when direction d
+changes the board), see legalMoves().
+"""
+
+from array import array
+
+MAX_EXPONENT = 15
+MAX_NUMBER   = 1 << MAX_EXPONENT
+
+# score of rows which can not be moved (merge of two tiles of MAX_NUMBER),
+# larger than score of any four rows which can be moved
+OVERFLOW_SCORE = 1 << 24
+
+ROW_MASK = 0xFFFF
+COL_MASK = 0x000F000F000F000F
+
+# tables are built on first use, see buildTables()
+_rowLeft    = None
+_rowRight   = None
+_colUp      = None
+_colDown    = None
+_scoreLeft  = None
+_scoreRight = None
+_emptyRow   = None
+_legalRow   = None
+
+# number of set bits and positions of set bits for every byte
+_popcount8 = bytes(bin(byte).count("1") for byte in range(256))
+_select8   = [bytes(i for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+def _moveRowLeft(exponents):
+    """
+    This function moves and merges one row (list of 4 exponents) to the left
+    using same rules as Game.__move_west. It returns new exponents and score.
+    An OverflowError is raised when two tiles of MAX_NUMBER are merged.
+    """
+    values = [e for e in exponents if e != 0]
+    score = 0
+    i = 0
+    while(i < len(values)-1):
+        if(values[i] == values[i+1]):
+            # exponents are limited to 4 bits (see module description)
+            if(values[i] == MAX_EXPONENT):
+                raise OverflowError("tile %d does not fit into bitboard"
+                                    % (2*MAX_NUMBER))
+            values[i] += 1
+            score += 1 << values[i]
+            del values[i+1]
+        i += 1
+    return values + [0]*(4-len(values)), score
+
+
+def _moveRowLeftChecked(exponents):
+    """
+    This function is same as _moveRowLeft, but rows which can not be moved
+    are returned unchanged with OVERFLOW_SCORE (for tables).
+    """
+    try:
+        return _moveRowLeft(exponents)
+    except OverflowError:
+        return exponents, OVERFLOW_SCORE
+
+
+def _spreadColumn(row):
+    """
+    This function converts a 16-bit row into a column (nibble y of row is
+    moved to bit 16*y).
+    """
+    return ((row         & 0xF)        |
+            ((row >>  4) & 0xF) << 16  |
+            ((row >>  8) & 0xF) << 32  |
+            ((row >> 12) & 0xF) << 48)
+
+
+def buildTables():
+    """
+    This function precomputes results and scores for all 65536 possible rows
+    in every direction. It is called automatically on first move.
+    """
+    global _rowLeft, _rowRight, _colUp, _colDown, _scoreLeft, _scoreRight
+    global _emptyRow, _legalRow
+
+    rowLeft    = array("H", bytes(2*65536))
+    rowRight   = array("H", bytes(2*65536))
+    colUp      = array("Q", bytes(8*65536))
+    colDown    = array("Q", bytes(8*65536))
+    scoreLeft  = array("I", bytes(4*65536))
+    scoreRight = array("I", bytes(4*65536))
+    emptyRow   = bytearray(65536)
+    legalRow   = bytearray(65536) # bit 0: row can move left, bit 1: right
+
+    for row in range(65536):
+        exponents = [row & 0xF, (row >> 4) & 0xF,
+                     (row >> 8) & 0xF, (row >> 12) & 0xF]
+        emptyRow[row] = sum(1 << x for x in range(4) if exponents[x] == 0)
+
+        left, score = _moveRowLeftChecked(exponents)
+        left = left[0] | left[1] << 4 | left[2] << 8 | left[3] << 12
+        rowLeft[row]   = left
+        colUp[row]     = _spreadColumn(left)
+        scoreLeft[row] = score
+
+        right, score = _moveRowLeftChecked(exponents[::-1])
+        right = right[3] | right[2] << 4 | right[1] << 8 | right[0] << 12
+        rowRight[row]   = right
+        colDown[row]    = _spreadColumn(right)
+        scoreRight[row] = score
+
+        # rows which can not be moved are legal, move() reports them
+        legalRow[row] = ((left != row or scoreLeft[row] == OVERFLOW_SCORE) |
+                         (right != row or scoreRight[row] == OVERFLOW_SCORE) << 1)
+
+    _rowLeft, _rowRight     = rowLeft, rowRight
+    _colUp, _colDown        = colUp, colDown
+    _scoreLeft, _scoreRight = scoreLeft, scoreRight
+    _emptyRow               = emptyRow
+    _legalRow               = legalRow
+
+
+def transpose(board):
+    """
+    This function mirrors a board at its main diagonal: (y, x) -> (x, y).
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a  = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def move(board, direction):
+    """
+    This function moves and merges all tiles of board in passed direction
+    (0,1,2,3 = N,E,S,W). It returns a tuple (new board, gained score). When
+    nothing can be moved, the returned board equals the passed one.
+    An OverflowError is raised when two tiles of MAX_NUMBER would be merged.
+    """
+    if(_rowLeft is None): buildTables()
+
+    r0 =  board        & ROW_MASK
+    r1 = (board >> 16) & ROW_MASK
+    r2 = (board >> 32) & ROW_MASK
+    r3 = (board >> 48) & ROW_MASK
+
+    if(direction == 1 or direction == 3):
+        if(direction == 3):
+            table, score = _rowLeft, _scoreLeft
+        else:
+            table, score = _rowRight, _scoreRight
+        new = (table[r0]       | table[r1] << 16 |
+               table[r2] << 32 | table[r3] << 48)
+    else:
+        # columns: rows of transposed board are columns of board
+        t  = transpose(board)
+        r0 =  t        & ROW_MASK
+        r1 = (t >> 16) & ROW_MASK
+        r2 = (t >> 32) & ROW_MASK
+        r3 = (t >> 48) & ROW_MASK
+        if(direction == 0):
+            table, score = _colUp, _scoreLeft
+        else:
+            table, score = _colDown, _scoreRight
+        new = (table[r0]       | table[r1] <<  4 |
+               table[r2] <<  8 | table[r3] << 12)
+
+    gained = score[r0] + score[r1] + score[r2] + score[r3]
+    if(gained >= OVERFLOW_SCORE):
+        raise OverflowError("tile %d does not fit into bitboard"
+                            % (2*MAX_NUMBER))
+    return new, gained
+
+
+def fromField(field):
+    """
+    This function converts a field (4x4 list of numbers) into a board.
+    """
+    board = 0
+    shift = 0
+    for row in field:
+        for number in row:
+            if(number):
+                exponent = number.bit_length() - 1
+                if(exponent >= MAX_EXPONENT):
+                    raise OverflowError("tile %d does not fit into bitboard"
+                                        % number)
+                board |= exponent << shift
+            shift += 4
+    return board
+
+
+def toField(board):
+    """
+    This function converts a board into a field (4x4 list of numbers).
+    """
+    field = []
+    for y in range(4):
+        row = []
+        for x in range(4):
+            exponent = board & 0xF
+            row.append(1 << exponent if exponent else 0)
+            board >>= 4
+        field.append(row)
+    return field
+
+
+def emptyMask(board):
+    """
+    This function returns 16-bit mask of empty fields of board.
+    """
+    if(_emptyRow is None): buildTables()
+    return (_emptyRow[board & ROW_MASK]              |
+            _emptyRow[(board >> 16) & ROW_MASK] << 4 |
+            _emptyRow[(board >> 32) & ROW_MASK] << 8 |
+            _emptyRow[(board >> 48) & ROW_MASK] << 12)
+
+
+def popcount(mask):
+    """
+    This function returns number of set bits of a mask (16 bits for 4x4
+    boards, larger masks are handled byte by byte).
+    """
+    if(mask <= 0xFFFF):
+        return _popcount8[mask & 0xFF] + _popcount8[mask >> 8]
+    count = 0
+    while(mask):
+        count += _popcount8[mask & 0xFF]
+        mask >>= 8
+    return count
+
+
+def selectBit(mask, k):
+    """
+    This function returns position of k-th (starting with 0) set bit of a
+    mask (counted from lowest bit).
+    """
+    offset = 0
+    while(True):
+        low = mask & 0xFF
+        n   = _popcount8[low]
+        if(k < n): return offset + _select8[low][k]
+        k      -= n
+        mask  >>= 8
+        offset += 8
+
+
+def legalMoves(board):
+    """
+    This function returns a 4-bit mask of directions which change the board
+    (bit 0,1,2,3 = N,E,S,W). Rows and columns are looked up in a table, no
+    move has to be done.
+    """
+    if(_legalRow is None): buildTables()
+    legal = _legalRow
+    rows = (legal[board & ROW_MASK]         | legal[(board >> 16) & ROW_MASK] |
+            legal[(board >> 32) & ROW_MASK] | legal[(board >> 48) & ROW_MASK])
+    t = transpose(board)
+    cols = (legal[t & ROW_MASK]         | legal[(t >> 16) & ROW_MASK] |
+            legal[(t >> 32) & ROW_MASK] | legal[(t >> 48) & ROW_MASK])
+    return (cols & 1) | (rows & 2) | (cols & 2) << 1 | (rows & 1) << 3
@@ -0,0 +1,253 @@
+from tkinter import Canvas
+import time
+
+from config import *
+
+"""
+Class CanvasBoard
+This class draws the board on one canvas (instead of one label per field).
+Every field has a static background rectangle and a tile (rectangle + text)
+which is reused for the whole game, text and colours are prepared once per
+exponent.
+When a direction is passed to render(), tiles slide to their new position
+and merged/new tiles pop up afterwards. Animations are driven by after() and
+based on elapsed time: when drawing takes too long, frames are dropped to
+keep the frame rate (FRAME_TIME).
+"""
+class CanvasBoard:
+    def __init__(self, root, colours, bg, size=4):
+        self.root = root
+        self.size = size
+
+        # text and colours per exponent: [ (text, fg, bg), ... ]
+        self.styles = [("" if exponent == 0 else str(1 << exponent), fg, bgTile)
+                       for exponent, fg, bgTile in colours]
+
+        self.canvas = Canvas(root, bg=bg, highlightthickness=0, borderwidth=0)
+
+        # backgrounds of empty fields and tiles (rectangle, text) per field
+        self.cells = [[self.canvas.create_rectangle(0, 0, 0, 0,
+                                                    fill    = self.styles[0][2],
+                                                    outline = "")
+                       for x in range(size)] for y in range(size)]
+        self.tiles = [[(self.canvas.create_rectangle(0, 0, 0, 0,
+                                                     outline = "",
+                                                     state   = "hidden"),
+                        self.canvas.create_text(0, 0, text="",
+                                                state = "hidden"))
+                       for x in range(size)] for y in range(size)]
+
+        # currently shown numbers and tiles which are not at their field
+        self.shown = [[0]*size for y in range(size)]
+        self.moved = set()
+
+        self.unit      = 0
+        self.animation = None
+        self.job       = None
+
+        # statistics: canvas calls during last frame, frames drawn/dropped
+        self.reconfigurations = 0
+        self.framesDrawn      = 0
+        self.framesDropped    = 0
+
+    def place(self, x, y, unit):
+        """
+        This function places the canvas at passed position and sets size of
+        all fields depending on grid unit.
+        """
+        self.finishAnimation()
+        self.unit = unit
+        size = (6*self.size-1) * unit
+        self.canvas.place(x=x, y=y, width=size, height=size)
+
+        for y in range(self.size):
+            for x in range(self.size):
+                self.canvas.coords(self.cells[y][x], *self.rectangle(y, x))
+                self.moveTile(y, x, y, x)
+
+    def setFont(self, font):
+        """
+        This function sets font of all tiles.
+        """
+        for tiles in self.tiles:
+            for rectangle, text in tiles:
+                self.canvas.itemconfig(text, font=font)
+
+    def rectangle(self, y, x, scale=1):
+        """
+        This function returns coordinates of field (y, x) (may be a float
+        position during animations) scaled around its center.
+        """
+        half   = 2.5 * self.unit * scale
+        center = 6 * self.unit
+        cx, cy = center*x + 2.5*self.unit, center*y + 2.5*self.unit
+        return (cx-half, cy-half, cx+half, cy+half)
+
+    def style(self, number):
+        """
+        This function returns (text, fg, bg) of a tile. Numbers larger than
+        the last colour (possible on large boards) get its colours.
+        """
+        exponent = number.bit_length()-1
+        if(exponent < len(self.styles)):
+            return self.styles[exponent]
+        label, fg, bg = self.styles[-1]
+        return (str(number), fg, bg)
+
+    def moveTile(self, y, x, toY, toX, scale=1):
+        """
+        This function moves tile of field (y, x) to (maybe not integer)
+        position (toY, toX).
+        """
+        rectangle, text = self.tiles[y][x]
+        x0, y0, x1, y1 = self.rectangle(toY, toX, scale)
+        self.canvas.coords(rectangle, x0, y0, x1, y1)
+        self.canvas.coords(text, (x0+x1)/2, (y0+y1)/2)
+        self.reconfigurations += 2
+
+    def draw(self, field):
+        """
+        This function shows passed field without animation. Only tiles which
+        changed or have been moved are reconfigured.
+        """
+        for y in range(self.size):
+            for x in range(self.size):
+                number = field[y][x]
+                if((y, x) in self.moved):
+                    self.moveTile(y, x, y, x)
+                if(number == self.shown[y][x]): continue
+                rectangle, text = self.tiles[y][x]
+                if(number):
+                    label, fg, bg = self.style(number)
+                    self.canvas.itemconfig(rectangle, fill=bg, state="normal")
+                    self.canvas.itemconfig(text, text=label, fill=fg,
+                                           state="normal")
+                else:
+                    self.canvas.itemconfig(rectangle, state="hidden")
+                    self.canvas.itemconfig(text, state="hidden")
+                self.reconfigurations += 2
+                self.shown[y][x] = number
+        self.moved.clear()
+
+    def slides(self, field, direction):
+        """
+        This function calculates where tiles of field go when moving in passed
+        direction (same rules as Game.move). It returns a list of slides
+        (fromY, fromX, toY, toX), the field after moving and merged fields.
+        """
+        n = self.size
+        if(direction == 0):   lines = [[(y, x) for y in range(n)] for x in range(n)]
+        elif(direction == 1): lines = [[(y, x) for x in range(n-1, -1, -1)] for y in range(n)]
+        elif(direction == 2): lines = [[(y, x) for y in range(n-1, -1, -1)] for x in range(n)]
+        else:                 lines = [[(y, x) for x in range(n)] for y in range(n)]
+
+        slides = []
+        merged = []
+        new    = [[0]*n for y in range(n)]
+        for line in lines:
+            target     = -1
+            lastNumber = 0
+            lastMerged = False
+            for (y, x) in line:
+                number = field[y][x]
+                if(not number): continue
+                if(number == lastNumber and not lastMerged):
+                    lastMerged = True
+                    toY, toX = line[target]
+                    new[toY][toX] *= 2
+                    merged.append((toY, toX))
+                else:
+                    target += 1
+                    lastNumber = number
+                    lastMerged = False
+                    toY, toX = line[target]
+                    new[toY][toX] = number
+                slides.append((y, x, toY, toX))
+        return slides, new, merged
+
+    def render(self, field, direction=None):
+        """
+        This function shows passed field. When the move (direction) which led
+        to field is passed, tiles are animated (slide, then merged and new
+        tiles pop up). A running animation is finished immediately.
+        """
+        self.finishAnimation()
+        self.reconfigurations = 0
+
+        if(direction is None):
+            self.draw(field)
+            return
+
+        slides, new, merged = self.slides(self.shown, direction)
+        # new field has to equal moved field except for one new tile
+        spawned = [(y, x) for y in range(self.size) for x in range(self.size)
+                   if new[y][x] != field[y][x]]
+        if(len(spawned) > 1 or
+           any(new[y][x] != 0 for (y, x) in spawned)):
+            self.draw(field)
+            return
+
+        self.animation = {"start":   time.perf_counter(),
+                          "frame":   0,
+                          "slides":  [s for s in slides if s[:2] != s[2:]],
+                          "field":   field,
+                          "landed":  False,
+                          "merged":  merged,
+                          "spawned": spawned}
+        self.frame()
+
+    def frame(self):
+        """
+        This function draws one frame of current animation and schedules the
+        next one. Position of tiles depends on elapsed time, so frames which
+        can not be drawn in time are skipped.
+        """
+        self.job = None
+        animation = self.animation
+        if(animation is None): return
+        self.reconfigurations = 0
+
+        now     = time.perf_counter()
+        elapsed = (now - animation["start"]) * 1000
+
+        if(elapsed < ANIMATION_SLIDE_TIME):
+            p = elapsed / ANIMATION_SLIDE_TIME
+            p = p*p*(3 - 2*p)
+            for (y, x, toY, toX) in animation["slides"]:
+                self.moveTile(y, x, y + (toY-y)*p, x + (toX-x)*p)
+                self.moved.add((y, x))
+        else:
+            if(not animation["landed"]):
+                self.draw(animation["field"])
+                animation["landed"] = True
+            q = (elapsed - ANIMATION_SLIDE_TIME) / ANIMATION_POP_TIME
+            if(q >= 1):
+                self.finishAnimation()
+                return
+            for (y, x) in animation["merged"]:
+                self.moveTile(y, x, y, x, 1 + 0.2*q*(1-q)*4)
+                self.moved.add((y, x))
+            for (y, x) in animation["spawned"]:
+                self.moveTile(y, x, y, x, 0.3 + 0.7*q)
+                self.moved.add((y, x))
+        self.framesDrawn += 1
+
+        # next frame at next point of time in frame grid, skip missed frames
+        frame = int((time.perf_counter() - animation["start"]) * 1000
+                    // FRAME_TIME) + 1
+        self.framesDropped += max(0, frame - animation["frame"] - 1)
+        animation["frame"] = frame
+        delay = animation["start"]*1000 + frame*FRAME_TIME - time.perf_counter()*1000
+        self.job = self.root.after(max(1, int(delay)), self.frame)
+
+    def finishAnimation(self):
+        """
+        This function stops current animation and shows its final field.
+        """
+        if(self.job is not None):
+            self.root.after_cancel(self.job)
+            self.job = None
+        if(self.animation is not None):
+            field = self.animation["field"]
+            self.animation = None
+            self.draw(field)
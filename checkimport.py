@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+"""
+Check cold import time of the headless game logic.
+Every module is imported in a fresh interpreter (python -X importtime), so
+the measured time is what a new worker process has to pay. The check fails
+when the time exceeds the budget or when tkinter gets imported.
+
+    python checkimport.py [budget in milliseconds]
+"""
+
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 50
+HEADLESS_MODULES = ["game", "bitboard", "terminal"]
+
+
+def measureImport(module):
+    """
+    This function imports passed module in a new interpreter and returns
+    cumulative import time (in milliseconds) and whether tkinter was loaded.
+    """
+    code = "import sys, %s; print('tkinter' in sys.modules)" % module
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+
+    # lines look like "import time:  self [us] | cumulative | name"
+    milliseconds = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if(len(parts) == 3 and parts[2].strip() == module):
+            milliseconds = int(parts[1]) / 1000
+    return milliseconds, result.stdout.strip() == "True"
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET_MS
+    failed = False
+    for module in HEADLESS_MODULES:
+        milliseconds, tkinter = measureImport(module)
+        ok = milliseconds <= budget and not tkinter
+        failed = failed or not ok
+        print("%-10s %7.2f ms (budget %.0f ms)%s%s" %
+              (module, milliseconds, budget,
+               "  tkinter imported!" if tkinter else "",
+               "" if ok else "  FAILED"))
+    return 1 if failed else 0
+
+
+if(__name__ == "__main__"):
+    sys.exit(main())
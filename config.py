@@ -0,0 +1,79 @@
+"""
+Settings
+This module contains keys, colours, fonts and grid settings which are used
+by the frontend. It does not import tkinter, so it can be used by other
+frontends as well.
+"""
+
+KEYS_UP    = ["Up"]    # w
+KEYS_RIGHT = ["Right"] # d
+KEYS_DOWN  = ["Down"]  # s
+KEYS_LEFT  = ["Left"]  # a
+
+KEYS_QUIT_GAME        = "q" # "<Control-q>"
+KEYS_NEW_GAME         = "n" # "<Control-n>"
+KEYS_OPEN_GAME        = "o" # "<Control-o>"
+KEYS_SAVE_GAME        = "<Control-s>"
+KEYS_UNDO             = "u" # "<Control-z>"
+KEYS_ZOOM_IN          = "+" # "<Control-plus>"
+KEYS_ZOOM_OUT         = "-" # "<Control-minus>"
+KEYS_ENTER_FULLSCREEN = "<F11>"
+KEYS_EXIT_FULLSCREEN  = "<Escape>"
+KEYS_DUMP_PROFILE     = "<F8>" # only with profiling (see profiling.py)
+KEYS_HINT             = "h"
+KEYS_AUTOPLAY         = "p"
+
+# names of directions 0,1,2,3 (shown as hint)
+DIRECTION_NAMES = ["Up", "Right", "Down", "Left"]
+
+BG             = "#776e65"
+BG_END_OF_GAME = "#edc22e"
+FONT_FIELD     = ["Consolas", "18", "bold"]
+FONT_TEXT      = ["Consolas", "16"]
+FONT_2048      = ["Consolas", "64"]
+FG_2048        = "#50d1f5"
+
+DEFAULT_DESIGN = [[ 0, "#000000", "#aa9898"], #       -
+                  [ 1, "#776e65", "#eee4da"], #       2
+                  [ 2, "#776e65", "#ede0c8"], #       4
+                  [ 3, "#f9f6f2", "#f2b179"], #       8
+                  [ 4, "#f9f6f2", "#f59563"], #      16
+                  [ 5, "#f9f6f2", "#f67c5f"], #      32
+                  [ 6, "#f9f6f2", "#f65e3b"], #      64
+                  [ 7, "#f9f6f2", "#edcf72"], #     128
+                  [ 8, "#f9f6f2", "#edcc61"], #     256
+                  [ 9, "#f9f6f2", "#edc850"], #     512
+                  [10, "#f9f6f2", "#edc53f"], #   1.024
+                  [11, "#f9f6f2", "#edc22e"], #   2.048
+                  [12, "#ffffff", "#50d1f5"], #   4.096
+                  [13, "#ffffff", "#7070ee"], #   8.192
+                  [14, "#ffffff", "#4040ee"], #  16.384
+                  [15, "#ffffff", "#484e4d"], #  32.768
+                  [16, "#ffffff", "#403635"], #  65.536
+                  [17, "#ffffff", "#201818"]] # 131.072
+
+# grid (in units) for a board of size x size fields: every field is 5 units
+# with 1 unit space, labels on the right side need 4 labels of 5+1 units
+def gridColumns(size):
+    return 6*size + 13
+
+def gridRows(size):
+    return max(6*size + 1, 25)
+
+GRID_COLUMNS = gridColumns(4) # 37
+GRID_ROWS    = gridRows(4)    # 25
+GRID_UNIT    = 20
+
+DEFAULT_WIDTH_WINDOW = GRID_COLUMNS * GRID_UNIT # 740
+
+RESIZE_DELAY = 16 # ms, resize events are processed at most once per frame
+
+# animations of canvas board (ms)
+FRAME_TIME           = 16
+ANIMATION_SLIDE_TIME = 100
+ANIMATION_POP_TIME   = 80
+
+# searches for hints and autoplay run on a background thread (see
+# searchworker.py), their results are polled every SEARCH_POLL_TIME ms
+SEARCH_POLL_TIME    = 2
+AUTOPLAY_TIME_LIMIT = 0.02 # seconds of search per move of autoplay
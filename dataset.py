@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+
+"""
+Dataset generator
+This script plays games with a policy (see runner.py) and writes every
+position as one row into NumPy files (.npy), e.g. for training of neural
+networks. A row contains
+
+    board      tile exponents of all fields before the move (0 = empty,
+               1 = 2, 2 = 4, ...), uint8 per field
+    direction  direction which has been played (0,1,2,3 = N,E,S,W)
+    reward     score gained by the move
+    score      final score of the game (outcome)
+    game       number of the game within its shard
+
+Rows are split into shards of --shard-rows rows. Every shard is written by
+one worker process directly into a memory-mapped file (nothing is sent to
+the main process); the last game of a shard is cut off when the shard is
+full. The main process writes a small index file (index.json) with file
+name, number of rows and games of every shard.
+
+    python dataset.py --positions 1000000 --policy greedy --output dataset
+
+Shards can be read without copying (memory-mapped, read-only):
+
+    index, shards = openDataset("dataset")
+    boards = shards[0]["board"]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+
+import numpy as np
+
+import bitboard
+from game import Game
+from ntuple import FILENAME_WEIGHTS
+from randomstream import RandomStream
+from runner import POLICIES, MASK64, SOLVER_DEPTH, gameSeed, policyDirections
+
+FILENAME_INDEX = "index.json"
+VERSION        = 1
+SHARD_ROWS     = 1 << 18 # about 7.5 MB per shard with 4x4 boards
+
+
+def rowType(size=4):
+    """
+    This function returns the NumPy type of one row for boards of size x size
+    fields.
+    """
+    return np.dtype([("board",     np.uint8, (size*size,)),
+                     ("direction", np.uint8),
+                     ("reward",    np.uint32),
+                     ("score",     np.uint32),
+                     ("game",      np.uint32)])
+
+
+def shardFilename(shard):
+    return "shard-%05d.npy" % shard
+
+
+def writeShard(directory, shard, rows, masterSeed, policy="random", size=4,
+               depth=SOLVER_DEPTH, weights=FILENAME_WEIGHTS):
+    """
+    This function plays games until passed number of rows is written to
+    shard number shard (runs in a worker process) and returns its entry of
+    the index. The file gets its name when it is complete.
+    """
+    filename  = os.path.join(directory, shardFilename(shard))
+    temporary = filename + ".tmp"
+    data = np.lib.format.open_memmap(temporary, mode="w+", dtype=rowType(size),
+                                     shape=(rows,))
+    complete = False
+    try:
+        games = fillShard(data, shard, masterSeed, policy, size, depth,
+                          weights)
+        data.flush()
+        complete = True
+    finally:
+        del data # closes memory map, so file can be renamed or removed
+        if(not complete):
+            os.remove(temporary) # incomplete shard
+    os.replace(temporary, filename)
+    return {"file": shardFilename(shard), "rows": rows, "games": games}
+
+
+def fillShard(data, shard, masterSeed, policy="random", size=4,
+              depth=SOLVER_DEPTH, weights=FILENAME_WEIGHTS):
+    """
+    This function plays games until all rows of data (memory-mapped shard)
+    are written and returns number of games.
+    """
+    rows      = len(data)
+    shardSeed = gameSeed(masterSeed, shard)
+    row   = 0
+    games = 0
+    while(row < rows):
+        seed = gameSeed(shardSeed, games)
+        rng  = RandomStream(seed ^ MASK64)
+        game = Game(useBitboard=True, rng=RandomStream(seed), size=size)
+
+        boards     = []
+        directions = []
+        rewards    = []
+        while(not game.isFinished() and row + len(directions) < rows):
+            board = [max(number.bit_length() - 1, 0)
+                     for line in game.field for number in line]
+            score = game.score
+            for direction in policyDirections(policy, game, rng, depth,
+                                              weights):
+                if(game.move(direction)): break
+            boards.append(board)
+            directions.append(direction)
+            rewards.append(game.score - score)
+
+        # finish game which is cut off, its outcome is needed
+        while(not game.isFinished()):
+            for direction in policyDirections(policy, game, rng, depth,
+                                              weights):
+                if(game.move(direction)): break
+
+        chunk = data[row:row+len(directions)]
+        chunk["board"]     = boards
+        chunk["direction"] = directions
+        chunk["reward"]    = rewards
+        chunk["score"]     = game.score
+        chunk["game"]      = games
+        row   += len(directions)
+        games += 1
+    return games
+
+
+def generate(directory, positions, shardRows=SHARD_ROWS, policy="random",
+             masterSeed=0, size=4, workers=None, depth=SOLVER_DEPTH,
+             weights=FILENAME_WEIGHTS):
+    """
+    This function writes passed number of positions as shards into
+    directory (in a process pool) and writes the index. It returns the index.
+    """
+    if(policy not in POLICIES):
+        raise ValueError("unknown policy %r (use one of %s)"
+                         % (policy, ", ".join(POLICIES)))
+    if(policy != "random" and size != 4):
+        raise ValueError("policy %s needs 4x4 boards" % policy)
+    if(policy == "ntuple" and not os.path.exists(weights)):
+        raise FileNotFoundError("weight file %s does not exist (see trainer.py)"
+                                % weights)
+    os.makedirs(directory, exist_ok=True)
+    shards = [min(shardRows, positions - start)
+              for start in range(0, positions, shardRows)]
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                             initializer=bitboard.buildTables) as executor:
+        futures = [executor.submit(writeShard, directory, shard, rows,
+                                   masterSeed, policy, size, depth, weights)
+                   for shard, rows in enumerate(shards)]
+        entries = [future.result() for future in futures]
+
+    index = {"version":   VERSION,
+             "boardSize": size,
+             "policy":    policy,
+             "seed":      masterSeed,
+             "rows":      sum(entry["rows"] for entry in entries),
+             "dtype":     np.lib.format.dtype_to_descr(rowType(size)),
+             "shards":    entries}
+    temporary = os.path.join(directory, FILENAME_INDEX + ".tmp")
+    with open(temporary, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(temporary, os.path.join(directory, FILENAME_INDEX))
+    return index
+
+
+def openDataset(directory):
+    """
+    This function returns the index and all shards of a dataset as read-only
+    memory-mapped arrays (no data is copied).
+    """
+    with open(os.path.join(directory, FILENAME_INDEX)) as f:
+        index = json.load(f)
+    if(index.get("version") != VERSION):
+        raise ValueError("%s is not a dataset (version %d)" % (directory, VERSION))
+    shards = [np.load(os.path.join(directory, entry["file"]), mmap_mode="r")
+              for entry in index["shards"]]
+    return index, shards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write positions of many games of 2048.")
+    parser.add_argument("--positions",  type=int, default=1000000,
+                        help="number of rows (all shards)")
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    parser.add_argument("--policy",     choices=POLICIES, default="random")
+    parser.add_argument("--seed",       type=int, default=0, help="master seed")
+    parser.add_argument("--size",       type=int, default=4,
+                        help="number of rows and columns of the board "
+                             "(policies other than random need 4)")
+    parser.add_argument("--workers",    type=int, default=None)
+    parser.add_argument("--depth",      type=int, default=SOLVER_DEPTH,
+                        help="search depth of policy solver")
+    parser.add_argument("--weights",    default=FILENAME_WEIGHTS,
+                        help="weight file for policy ntuple")
+    parser.add_argument("--output",     default="dataset",
+                        help="directory of shards and index")
+    args = parser.parse_args()
+    if(args.policy != "random" and args.size != 4):
+        parser.error("policy %s needs 4x4 boards (use --policy random)"
+                     % args.policy)
+
+    index = generate(args.output, args.positions, args.shard_rows, args.policy,
+                     args.seed, args.size, args.workers, args.depth,
+                     args.weights)
+    print("%d rows in %d shards written to %s"
+          % (index["rows"], len(index["shards"]), args.output))
+
+
+if(__name__ == "__main__"):
+    main()
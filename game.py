@@ -0,0 +1,579 @@
+"""
+This module contains the backend (class Game). It does not depend on tkinter,
+so it can be imported without opening a window, e.g.
+
+    from game import Game
+    game = Game()
+    game.move(0)
+"""
+
+FILENAME_HIGHSCORE = "2048highscore.txt" # old format, only imported
+FILENAME_SCORES    = "2048scores.txt"
+FILENAME_SAVEGAME  = "2048savegame.bin"
+
+UNDO_LIMIT = 100 # number of moves which can be undone
+
+DEFAULT_SIZE    = 4
+LINE_CACHE_SIZE = 1 << 16 # lines (rows/columns) whose move result is cached
+
+# bits per field of Game.board: 4 for games with bitboard engine (board is a
+# bitboard then, see bitboard.py), otherwise 8 (one byte per field)
+CELL_BITS      = 4
+CELL_BITS_WIDE = 8
+
+# numbers of exponents (0 = empty field)
+NUMBERS = [0] + [1 << exponent for exponent in range(1, 1 << CELL_BITS_WIDE)]
+
+# bit 4*i is set when field i of a bitboard is 15 (tiles of 32768 can't be
+# merged by bitboard engine, see bitboard.py)
+LOW_NIBBLES = 0x1111111111111111
+
+# translates exponents (one byte per field) into "1" (empty) and "0"
+EMPTY_DIGITS = b"1" + b"0"*255
+
+# translates hexadecimal digits (one per field of a bitboard) into exponents
+HEX_EXPONENTS = bytes.maketrans(b"0123456789abcdef", bytes(range(16)))
+
+from collections import deque
+from functools import lru_cache
+import os
+
+import bitboard
+from randomstream import RandomStream
+import scores
+import snapshot
+
+
+@lru_cache(maxsize=LINE_CACHE_SIZE)
+def slideLine(line):
+    """
+    This function moves and merges one line (tuple of numbers) to its start
+    and returns the new line (tuple of same length) and gained score.
+    Results are cached, so a line which has been seen before costs one
+    lookup, no matter how long it is.
+    """
+    # 1. get list without empty fields (just numbers)
+    values = [number for number in line if number]
+    # 2. merge
+    score = 0
+    i = 0
+    while(i < len(values)-1):
+        if(values[i] == values[i+1]):
+            values[i] *= 2
+            score += values[i]
+            del values[i+1]
+        i += 1
+    # 3. fill up with empty fields
+    return tuple(values) + (0,)*(len(line)-len(values)), score
+
+
+@lru_cache(maxsize=LINE_CACHE_SIZE)
+def slideExponents(line):
+    """
+    This function works like slideLine() for a line of exponents (bytes,
+    0 = empty field) and returns the new line (bytes) and gained score.
+    """
+    values = [exponent for exponent in line if exponent]
+    score = 0
+    i = 0
+    while(i < len(values)-1):
+        if(values[i] == values[i+1]):
+            values[i] += 1
+            score += 1 << values[i]
+            del values[i+1]
+        i += 1
+    return bytes(values) + bytes(len(line)-len(values)), score
+
+
+@lru_cache(maxsize=LINE_CACHE_SIZE)
+def lineMoves(line):
+    """
+    This function returns for a line of exponents (bytes) whether its tiles
+    can move to its start (bit 0) and to its end (bit 1).
+    """
+    reverse = line[::-1]
+    return ((slideExponents(line)[0] != line) |
+            (slideExponents(reverse)[0] != reverse) << 1)
+
+
+def packField(field, bits=CELL_BITS_WIDE):
+    """
+    This function packs a field (size x size list of numbers) into one
+    integer: the exponent of field (y, x) is stored in bits at bit
+    bits*(size*y+x). With 4 bits a 4x4 board is a bitboard (see
+    bitboard.py), with 8 bits it is the bytes of all exponents. It returns
+    (board, bits); 4 bits are increased to CELL_BITS_WIDE when a tile does
+    not fit into a bitboard.
+    """
+    exponents = bytes(number.bit_length()-1 if number else 0
+                      for row in field for number in row)
+    if(bits == CELL_BITS_WIDE or max(exponents) >= bitboard.MAX_EXPONENT):
+        return int.from_bytes(exponents, "little"), CELL_BITS_WIDE
+    # one hexadecimal digit per field (second digit of every byte), last
+    # field first
+    return int(exponents.hex()[::-2], 16), CELL_BITS
+
+
+def unpackExponents(board, size, bits=CELL_BITS_WIDE):
+    """
+    This function returns the exponents of all fields of a packed board
+    (bytes, field (y, x) at index size*y+x).
+    """
+    if(bits == CELL_BITS_WIDE):
+        return board.to_bytes(size*size, "little")
+    digits = "%0*x" % (size*size, board)
+    return digits[::-1].encode().translate(HEX_EXPONENTS)
+
+
+def unpackField(board, size, bits=CELL_BITS_WIDE):
+    """
+    This function returns the field (size x size numbers, tuple of row
+    tuples) of a packed board (see packField).
+    """
+    numbers = tuple([NUMBERS[exponent]
+                     for exponent in unpackExponents(board, size, bits)])
+    return tuple(numbers[i:i+size] for i in range(0, size*size, size))
+
+
+@lru_cache(maxsize=None)
+def scoreFilenames(size):
+    """
+    This function returns (score file, old highscore file or None) for
+    boards of passed size. Both are located in same directory as this
+    script, other board sizes than 4x4 have their own score file. All games
+    of one size share the returned strings.
+    """
+    # get directory in which the script/file (game.py) is located
+    pathDir = os.path.dirname(os.path.abspath(__file__))
+
+    # append specified filename to directory of script
+    if(size == DEFAULT_SIZE):
+        return (os.path.join(pathDir, FILENAME_SCORES),
+                os.path.join(pathDir, FILENAME_HIGHSCORE))
+    name, extension = os.path.splitext(FILENAME_SCORES)
+    return (os.path.join(pathDir, "%s%dx%d%s" % (name, size, size, extension)),
+            None)
+
+
+"""
+Class Game
+This class implements the backend including following important functions
+(the board has size x size fields, default 4x4):
+
+ - move(direction)
+    0 - move north / up
+    1 - move east  / right
+    2 - move south / down
+    3 - move west  / left
+ - readHighScore()
+ - writeHighScore()
+ - saveGame(filename)
+ - openGame(filename, index)
+ - undo()
+ - newGame()
+ - isFinished()
+ - legalMoves()
+
+The board is stored in one integer (self.board, see packField). The field
+(size x size numbers) is built from it as tuple of row tuples when it is
+read, so it can't be changed in place (game.field[y][x] = number raises a
+TypeError); use setField() instead. Undo history keeps one integer per move.
+Instances have no __dict__, so many games can be kept in memory: a new game
+takes about 330 bytes with its own RandomStream (about 2.5 KB more with a
+random.Random, state of the Mersenne Twister).
+"""
+class Game:
+    __slots__ = ("size", "probability4", "rng", "useBitboard", "journal",
+                 "filename", "filenameLegacy", "board", "cellBits",
+                 "emptyMask", "legal", "score", "round", "history", "scores",
+                 "highscore", "recorded")
+
+    def __init__(self, useBitboard=False, journal=None, rng=None,
+                 size=DEFAULT_SIZE):
+        # number of rows and columns of the board
+        if(size < 2):
+            raise ValueError("board must have at least 2x2 fields")
+        self.size = size
+
+        # define probability of fours when random numbers appear (in percent)
+        self.probability4 = 10
+
+        # every game has its own random number generator (any random.Random
+        # or RandomStream, default: RandomStream with random seed)
+        self.rng = rng if rng is not None else RandomStream()
+
+        # use precomputed bitboard tables for moves (see bitboard.py, only
+        # possible for 4x4 boards)
+        self.useBitboard = useBitboard and size == 4
+
+        # optional journal which records every change (see journal.py)
+        self.journal = journal
+
+        # construct filename of highscore file
+        self.initFileName()
+
+        # initialize a new game
+        self.newGame()
+
+    def newGame(self):
+        # initialize/reset field and values
+        self.initField()
+        self.initValues()
+
+        if(self.journal is not None):
+            self.journal.recordNewGame(self)
+
+    def initValues(self):
+        """
+        This function initializes all variables which are necessary beside
+        the field / numbers.
+        """
+        self.score = 0 # max (4x4): 3932164
+        self.round = 0
+
+        # states before last moves, each packed into one integer (board,
+        # score, round), created on first move
+        self.history = None
+        self.readHighScore()
+
+    def initFileName(self):
+        """
+        This function gets filepath/-name for score file. It has to be
+        in same directory in which the script is. Other board sizes than
+        4x4 have their own score file (see scoreFilenames).
+        """
+        self.filename, self.filenameLegacy = scoreFilenames(self.size)
+
+    def initField(self):
+        """
+        This function creates an empty field and inserts two random numbers.
+        """
+        self.board     = 0
+        self.cellBits  = CELL_BITS if self.useBitboard else CELL_BITS_WIDE
+        self.emptyMask = (1 << self.size*self.size) - 1
+        self.legal     = None
+
+        self.insertRandomNumber()
+        self.insertRandomNumber()
+
+    def readHighScore(self):
+        """
+        This function gets the high score from score store (see scores.py).
+        The file is only read once per process, afterwards the cached value
+        is used. When this is not possible the highscore is initalized.
+        """
+        try:
+            self.scores = scores.getStore(self.filename, self.filenameLegacy)
+            self.highscore = self.scores.highscore()
+        except Exception as e:
+            print("Can't read scores from file", FILENAME_SCORES)
+            print("***", e)
+            self.scores = None
+            self.highscore = 0
+        self.recorded = None
+
+    def writeHighScore(self):
+        """
+        This functions tries to add result of current game (score, max tile,
+        rounds) to the score file. Every result is only added once.
+        """
+        self.highscore = max(self.highscore, self.score)
+        result = (self.score, self.round)
+        if(self.scores is None or self.score == 0 or result == self.recorded):
+            return
+        try:
+            self.scores.add(self.score,
+                            max(max(row) for row in self.field),
+                            self.round)
+            self.recorded = result
+        except Exception as e:
+            print("Can't write highscore", self.highscore,
+                  "into file", FILENAME_SCORES)
+            print("***", e)
+
+    def saveGame(self, filename):
+        """
+        This function appends a snapshot of current game (field, score,
+        round, probability4 and state of random number generator) to passed
+        file (see snapshot.py) and returns its index in that file.
+        """
+        return snapshot.appendSnapshot(filename, self)
+
+    def openGame(self, filename, index=-1):
+        """
+        This function loads snapshot number index (default: last one) from
+        passed file, so the game continues exactly where it was saved.
+        """
+        with snapshot.SnapshotReader(filename) as snapshots:
+            snapshots.restore(index, self)
+        self.history = None
+
+        if(self.journal is not None):
+            self.journal.recordRestore(self)
+
+    def undo(self):
+        """
+        This function restores the state before last move (up to UNDO_LIMIT
+        moves can be undone). It returns whether there was a move to undo.
+        """
+        if(not self.history): return False
+        state = self.history.pop()
+        self.round = state & 0xFFFFFFFF
+        self.score = state >> 32 & 0xFFFFFFFFFFFFFFFF
+        self.setBoard(state >> 96)
+
+        if(self.journal is not None):
+            self.journal.recordUndo(self)
+        return True
+
+    def move(self, direction):
+        """
+        This function implements the fundamental part of the game.
+        It moves and merges the tiles in passed direction.
+        Direction has to be 0,1,2,3 (N,E,S,W)
+        When move was successful (something changed/merged) a new number
+        will be inserted, round will be incremented, highscore updated and
+        True will be returned.
+        Directions which can not change anything (see legalMoves) are
+        rejected without moving.
+        """
+        if(not self.legalMoves() >> direction & 1): return False
+        if(self.history is None):
+            self.history = deque(maxlen=UNDO_LIMIT)
+        # state before move: board, score (64 bits), round (32 bits)
+        self.history.append((self.board << 64 | self.score) << 32 | self.round)
+        if(self.slide(direction)):
+            y, x = self.insertRandomNumber()
+            self.round += 1
+            self.highscore = max(self.score, self.highscore)
+            if(self.journal is not None):
+                self.journal.recordMove(self, direction, y, x,
+                                        self.getNumber(y, x))
+            return True
+        self.history.pop()
+        return False
+
+    def replayMove(self, direction, y, x, number):
+        """
+        This function repeats a recorded move: same as move() but passed
+        number is inserted at (y, x) instead of a random one.
+        """
+        if(self.slide(direction)):
+            cell     = self.size*y+x
+            exponent = number.bit_length()-1
+            if(self.cellBits == CELL_BITS and exponent >= bitboard.MAX_EXPONENT):
+                self.widen()
+            self.board |= exponent << self.cellBits*cell
+            self.emptyMask &= ~(1 << cell)
+            self.legal = None
+            self.round += 1
+            self.highscore = max(self.score, self.highscore)
+            return True
+        return False
+
+    def slide(self, direction):
+        """
+        This function moves and merges the tiles (board and score are
+        updated) and returns whether something changed.
+        Using the bitboard engine is only possible for 4x4 boards without
+        tiles of bitboard.MAX_NUMBER or larger (then 8 bits per field are
+        used), otherwise rows are used.
+        """
+        board = self.board
+        if(self.cellBits == CELL_BITS):
+            # board is a bitboard already, no conversion needed
+            newBoard, gained = bitboard.move(board, direction)
+            if(newBoard == board): return False
+            self.board     = newBoard
+            self.score    += gained
+            self.emptyMask = bitboard.emptyMask(newBoard)
+            self.legal     = None
+            if(newBoard & newBoard >> 1 & newBoard >> 2 & newBoard >> 3 &
+               LOW_NIBBLES):
+                self.widen()
+            return True
+
+        newBoard = self.__slideRows(board, direction)
+        if(newBoard == board): return False
+        self.setBoard(newBoard)
+        return True
+
+    @property
+    def field(self):
+        """
+        The field: size x size numbers (0 = empty field) as tuple of row
+        tuples. It is built from self.board on every access and can't be
+        changed (use setField).
+        """
+        return unpackField(self.board, self.size, self.cellBits)
+
+    @field.setter
+    def field(self, field):
+        self.setField(field)
+
+    def getNumber(self, y, x):
+        """
+        This function returns the number of field (y, x) (0 = empty)
+        without building the whole field.
+        """
+        bits = self.cellBits
+        return NUMBERS[self.board >> bits*(self.size*y+x) & ((1 << bits) - 1)]
+
+    def setField(self, field):
+        """
+        This function replaces the field (size x size list of numbers,
+        size has to be same as size of game, otherwise a ValueError is
+        raised).
+        """
+        if(len(field) != self.size or
+           any(len(row) != self.size for row in field)):
+            raise ValueError("field has to have %dx%d fields"
+                             % (self.size, self.size))
+        # states of undo history have to be packed with same number of bits
+        bits = self.cellBits if self.history else \
+               CELL_BITS if self.useBitboard else CELL_BITS_WIDE
+        board, bits = packField(field, bits)
+        if(bits > self.cellBits):
+            self.widen()
+        self.cellBits = bits
+        self.setBoard(board)
+
+    def setBoard(self, board):
+        """
+        This function replaces the packed board (see packField), mask of
+        empty fields and legal moves are updated.
+        """
+        self.board = board
+        self.updateEmptyMask()
+        self.legal = None
+
+    def widen(self):
+        """
+        This function switches to CELL_BITS_WIDE bits per field (when a tile
+        does not fit into a bitboard anymore). Board and states of undo
+        history are packed again.
+        """
+        def repack(board):
+            return int.from_bytes(unpackExponents(board, self.size,
+                                                  self.cellBits), "little")
+        self.board = repack(self.board)
+        if(self.history):
+            low = (1 << 96) - 1
+            self.history = deque([repack(state >> 96) << 96 | state & low
+                                  for state in self.history],
+                                 maxlen=UNDO_LIMIT)
+        self.cellBits = CELL_BITS_WIDE
+
+    def updateEmptyMask(self):
+        """
+        This function calculates the mask of empty fields: bit size*y+x is
+        set when field (y, x) is empty.
+        """
+        if(self.cellBits == CELL_BITS):
+            self.emptyMask = bitboard.emptyMask(self.board)
+        else:
+            # one digit per field, last field first
+            exponents = unpackExponents(self.board, self.size)
+            self.emptyMask = int(exponents.translate(EMPTY_DIGITS)[::-1], 2)
+
+    def __slideRows(self, board, direction):
+        """
+        This function moves and merges all rows (east, west) or columns
+        (north, south) of passed board (8 bits per field) in passed
+        direction. Every line is turned into bytes in direction of the move
+        and handled in one step by slideExponents() (cached). The new board
+        is returned, score is updated.
+        """
+        size      = self.size
+        exponents = unpackExponents(board, size)
+        new       = bytearray(size*size)
+        vertical  = direction == 0 or direction == 2
+        reverse   = direction == 1 or direction == 2
+        for i in range(size):
+            # column i (north, south) or row i (east, west)
+            lines = slice(i, None, size) if vertical else \
+                    slice(i*size, i*size+size)
+            line  = exponents[lines]
+            if(reverse):
+                line, gained = slideExponents(line[::-1])
+                line = line[::-1]
+            else:
+                line, gained = slideExponents(line)
+            new[lines]  = line
+            self.score += gained
+        return int.from_bytes(new, "little")
+
+    def insertRandomNumber(self):
+        """
+        This function inserts 2 or 4 at random field (must be free).
+        Empty fields are numbered from 1 to n from top left to bottom right
+        corner. One 64-bit random number decides which of these fields is
+        chosen (upper half) and whether a 4 is inserted (lower half, using
+        previously defined probabilty for a 4); both are scaled by multiply
+        and shift. The chosen field is the position of the corresponding bit
+        in the mask of empty fields (no need to loop through the field). At
+        the end coordinates of field where new number was inserted will be
+        returned.
+        """
+        nulls = bitboard.popcount(self.emptyMask)
+        if(nulls == 0): return False
+        bits = self.rng.getrandbits(64)
+        cell = bitboard.selectBit(self.emptyMask, (bits >> 32) * nulls >> 32)
+        y, x = divmod(cell, self.size)
+        if((bits & 0xFFFFFFFF) * 100 >> 32 < self.probability4):
+            self.board |= 2 << self.cellBits*cell # 4
+        else:
+            self.board |= 1 << self.cellBits*cell # 2
+        self.emptyMask &= ~(1 << cell)
+        self.legal = None
+        return (y,x)
+
+    def getNumNullValues(self):
+        """
+        This function returns number of empty fields
+        """
+        return bitboard.popcount(self.emptyMask)
+
+    def isFinished(self):
+        """
+        This functions returns whether game is finshed or not.
+        A game is finished when no more move can be done (see legalMoves).
+        """
+        return self.legalMoves() == 0
+
+    def legalMoves(self):
+        """
+        This function returns a 4-bit mask of directions which would change
+        the field (bit 0,1,2,3 = N,E,S,W). The mask is calculated with row
+        tables (see bitboard.py, 4x4 only) and kept until the field changes.
+        """
+        if(self.legal is None):
+            if(self.cellBits == CELL_BITS):
+                self.legal = bitboard.legalMoves(self.board)
+            else:
+                self.legal = self.__legalMoves()
+        return self.legal
+
+    def __legalMoves(self):
+        """
+        This function calculates the mask of legal moves without bitboard
+        (for other sizes and fields with large numbers). A direction is legal
+        when any row or column changes (see lineMoves, cached).
+        """
+        size      = self.size
+        exponents = unpackExponents(self.board, size)
+        rows    = 0
+        columns = 0
+        for i in range(size):
+            rows    |= lineMoves(exponents[i*size:i*size+size])
+            columns |= lineMoves(exponents[i::size])
+        # start of rows is west, start of columns is north
+        return columns & 1 | rows & 2 | columns << 1 & 4 | rows << 3 & 8
+
+    def show(self):
+        """
+        This show function prints current game status (non-interactive mode
+        of terminal frontend, see terminal.py). It is used for debugging.
+        """
+        from terminal import printGame
+        printGame(self)
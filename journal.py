@@ -0,0 +1,343 @@
+"""
+Journal
+This module records every change of a game in an append-only file and
+replays it afterwards.
+
+A move is stored in one byte: direction (2 bits), new number (1 bit, 2 or 4)
+and field of new number (4 bits). Boards with more than 16 fields need a
+second byte for the field. Everything else (new game, undo, opened game) is
+stored as full state: marker byte and state (tile exponents, score, round -
+24 bytes for 4x4 boards). Every KEYFRAME_INTERVAL moves a full state is
+stored as keyframe as well. Board size is stored in the header, one journal
+holds games of one size.
+
+Every entry (except keyframes) is one step. A second file (<journal>.idx)
+holds step and offset of every full state, so replay can start at the
+nearest keyframe instead of the beginning of the journal.
+
+    game = Game(journal=Journal("session.journal"))
+    ...
+    game.journal.close()
+
+    with Replay("session.journal") as replay:
+        field, score, round = replay.stateAt(1000)
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+import mmap
+import os
+import struct
+
+from game import Game
+
+MAGIC   = b"2048JRNL"
+VERSION = 1
+
+KEYFRAME_INTERVAL = 256
+BUFFER_SIZE       = 4096
+
+# kinds of full states (marker byte is 0x80 | kind)
+STATE_KEYFRAME = 0
+STATE_NEW_GAME = 1
+STATE_UNDO     = 2
+STATE_RESTORE  = 3
+
+HEADER = struct.Struct("<8sHHB3x") # board size 0 (older journals) = 4
+INDEX  = struct.Struct("<QQ") # step, offset
+
+
+@lru_cache(maxsize=None)
+def stateStruct(size):
+    """
+    This function returns the struct of a full state for boards of passed
+    size.
+    """
+    return struct.Struct("<%dBII" % (size*size))
+
+STATE = stateStruct(4)
+
+
+def moveSize(size):
+    """
+    This function returns number of bytes of a move for boards of passed
+    size.
+    """
+    return 1 if size*size <= 16 else 2
+
+
+def packState(kind, field, score, round):
+    exponents = [number.bit_length()-1 if number else 0
+                 for row in field for number in row]
+    return bytes([0x80 | kind]) + stateStruct(len(field)).pack(*exponents,
+                                                                score, round)
+
+
+def unpackState(data, offset, size=4):
+    cells  = size*size
+    values = stateStruct(size).unpack_from(data, offset)
+    field  = [[(1 << e) if e else 0 for e in values[i:i+size]]
+              for i in range(0, cells, size)]
+    return field, values[cells], values[cells+1]
+
+
+def readIndex(filename):
+    """
+    This function returns steps and offsets of all full states of a journal.
+    """
+    steps, offsets = [], []
+    try:
+        with open(filename + ".idx", "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return steps, offsets
+    for step, offset in INDEX.iter_unpack(data[:len(data)//INDEX.size*INDEX.size]):
+        steps.append(step)
+        offsets.append(offset)
+    return steps, offsets
+
+
+def scanEntries(data, offset, size=4):
+    """
+    This generator yields (offset, marker) of every entry starting at offset.
+    """
+    end       = len(data)
+    stateSize = 1 + stateStruct(size).size
+    move      = moveSize(size)
+    while(offset < end):
+        marker = data[offset]
+        yield offset, marker
+        offset += stateSize if marker & 0x80 else move
+
+
+class Journal:
+    """
+    This class writes entries of a game into a journal file. Entries are
+    collected in a buffer and written in chunks, call flush() or close()
+    to write remaining entries.
+    """
+    def __init__(self, filename, keyframeInterval=KEYFRAME_INTERVAL,
+                 bufferSize=BUFFER_SIZE, boardSize=4):
+        self.filename         = filename
+        self.keyframeInterval = keyframeInterval
+        self.bufferSize       = bufferSize
+        self.boardSize        = boardSize
+        self.moveSize         = moveSize(boardSize)
+
+        self.file  = open(filename, "a+b")
+        self.size  = self.file.seek(0, os.SEEK_END)
+        if(self.size == 0):
+            self.file.write(HEADER.pack(MAGIC, VERSION, keyframeInterval,
+                                        boardSize))
+            self.size = HEADER.size
+            self.step = 0
+        else:
+            self.file.seek(0)
+            magic, version, interval, size = HEADER.unpack(
+                self.file.read(HEADER.size))
+            if(magic != MAGIC or version != VERSION or (size or 4) != boardSize):
+                self.file.close()
+                raise ValueError("%s is not a journal of %dx%d games"
+                                 % (filename, boardSize, boardSize))
+            self.step = self.countSteps()
+        self.index = open(filename + ".idx", "ab")
+
+        self.buffer      = bytearray()
+        self.indexBuffer = bytearray()
+        self.movesSinceState = 0
+
+    def countSteps(self):
+        """
+        This function counts steps of an existing journal (starting at its
+        last full state).
+        """
+        steps, offsets = readIndex(self.filename)
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        step   = steps[-1]   if steps   else 0
+        offset = offsets[-1] if offsets else HEADER.size
+        for offset, marker in scanEntries(data, offset, self.boardSize):
+            if(offsets and offset == offsets[-1]): continue
+            if(marker & 0x80 and marker & 0x7F == STATE_KEYFRAME): continue
+            step += 1
+        return step
+
+    def recordMove(self, game, direction, y, x, number):
+        """
+        This function records a move: direction and new number at (y, x).
+        After KEYFRAME_INTERVAL moves a keyframe is recorded.
+        """
+        cell = self.boardSize*y + x
+        if(self.moveSize == 1):
+            self.buffer.append(direction << 5 | (number == 4) << 4 | cell)
+        else:
+            self.buffer.append(direction << 5 | (number == 4) << 4)
+            self.buffer.append(cell)
+        self.step += 1
+        self.movesSinceState += 1
+        if(self.movesSinceState >= self.keyframeInterval):
+            self.recordState(game, STATE_KEYFRAME)
+        elif(len(self.buffer) >= self.bufferSize):
+            self.flush()
+
+    def recordState(self, game, kind):
+        """
+        This function records full state of game (new game, undo, restore or
+        keyframe) and adds it to index.
+        """
+        if(game.size != self.boardSize):
+            raise ValueError("journal records %dx%d games"
+                             % (self.boardSize, self.boardSize))
+        if(kind != STATE_KEYFRAME): self.step += 1
+        offset = self.size + len(self.buffer)
+        self.buffer += packState(kind, game.field, game.score, game.round)
+        self.indexBuffer += INDEX.pack(self.step, offset)
+        self.movesSinceState = 0
+        if(len(self.buffer) >= self.bufferSize):
+            self.flush()
+
+    def recordNewGame(self, game):
+        self.recordState(game, STATE_NEW_GAME)
+
+    def recordUndo(self, game):
+        self.recordState(game, STATE_UNDO)
+
+    def recordRestore(self, game):
+        self.recordState(game, STATE_RESTORE)
+
+    def flush(self):
+        """
+        This function writes buffered entries (journal first, so index never
+        points behind end of journal).
+        """
+        if(self.buffer):
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.size += len(self.buffer)
+            self.buffer.clear()
+        if(self.indexBuffer):
+            self.index.write(self.indexBuffer)
+            self.index.flush()
+            self.indexBuffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Replay:
+    """
+    This class rebuilds states of a recorded game. Seeking starts at the
+    nearest full state before requested step (see index).
+    """
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.keyframeInterval, size = HEADER.unpack_from(self.data, 0)
+        if(magic != MAGIC or version != VERSION):
+            self.close()
+            raise ValueError("%s is not a journal (version %d)"
+                             % (filename, VERSION))
+        self.boardSize = size or 4
+
+        self.steps, self.offsets = readIndex(filename)
+        self.game = Game(useBitboard=True, size=self.boardSize)
+
+    def __len__(self):
+        """
+        Number of steps in journal.
+        """
+        step = 0
+        for step, field, score, round in self.states(self.steps[-1]
+                                                     if self.steps else 0):
+            pass
+        return step
+
+    def states(self, start=0):
+        """
+        This generator yields (step, field, score, round) for every step
+        beginning with step start.
+        """
+        i = bisect_right(self.steps, start) - 1
+        if(i < 0):
+            step, offset = 0, HEADER.size
+        else:
+            step, offset = self.steps[i], self.offsets[i]
+            self.setState(*unpackState(self.data, offset+1, self.boardSize))
+            offset += 1 + stateStruct(self.boardSize).size
+            if(step >= start):
+                yield step, self.game.field, self.game.score, self.game.round
+
+        game = self.game
+        data = self.data
+        size = self.boardSize
+        longMoves = moveSize(size) > 1
+        for offset, marker in scanEntries(data, offset, size):
+            if(marker & 0x80):
+                self.setState(*unpackState(data, offset+1, size))
+                if(marker & 0x7F == STATE_KEYFRAME): continue
+            else:
+                cell = data[offset+1] if longMoves else marker & 0xF
+                game.replayMove(marker >> 5, cell // size, cell % size,
+                                4 if marker & 0x10 else 2)
+            step += 1
+            if(step >= start):
+                yield step, game.field, game.score, game.round
+
+    def games(self):
+        """
+        This generator yields (field, score, round) of every game in the
+        journal, taken when the next game is started (or at end of journal).
+        Fields are copies.
+        """
+        game = self.game
+        data = self.data
+        size = self.boardSize
+        longMoves = moveSize(size) > 1
+        started   = False
+        for offset, marker in scanEntries(data, HEADER.size, size):
+            if(marker & 0x80):
+                if(marker & 0x7F == STATE_NEW_GAME and started):
+                    yield [row[:] for row in game.field], game.score, game.round
+                self.setState(*unpackState(data, offset+1, size))
+            else:
+                cell = data[offset+1] if longMoves else marker & 0xF
+                game.replayMove(marker >> 5, cell // size, cell % size,
+                                4 if marker & 0x10 else 2)
+            started = True
+        if(started):
+            yield [row[:] for row in game.field], game.score, game.round
+
+    def setState(self, field, score, round):
+        self.game.setField(field)
+        self.game.score = score
+        self.game.round = round
+
+    def stateAt(self, step):
+        """
+        This function returns (field, score, round) after passed step (the
+        first step is 1, the state of the new game). An IndexError is raised
+        when there is no such step.
+        """
+        if(step < 1):
+            raise IndexError("steps start with 1")
+        for current, field, score, round in self.states(step):
+            return [row[:] for row in field], score, round
+        raise IndexError("journal has less than %d steps" % step)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+
+"""
+Load generator
+This script plays games on a game server (see server.py) to measure its
+throughput. Every connection plays its sessions with random moves and keeps
+up to --pipeline requests in flight (sent without waiting for responses).
+Finished games are closed and replaced by new ones.
+
+At the end requests per second and round trip latency (p50/p99, measured
+from sending a request until its response arrived) are printed.
+
+    python loadgen.py [--port 2048 | --unix PATH] [--connections 20]
+                      [--sessions 10] [--requests 100000] [--pipeline 16]
+"""
+
+from collections import deque
+import argparse
+import asyncio
+import json
+import time
+
+from profiling import Histogram
+from randomstream import RandomStream
+from server import PORT
+
+
+async def runConnection(connect, requests, sessions, pipeline, seed, latency):
+    """
+    This coroutine sends passed number of moves over one connection and
+    records round trip time of every request in histogram latency. It
+    returns number of games which have been finished.
+    """
+    reader, writer = await connect()
+    rng = RandomStream(seed)
+
+    # requests in flight: (send time, command, session or slot of new game)
+    inFlight = deque()
+    def send(request, tag):
+        writer.write((json.dumps(request) + "\n").encode())
+        inFlight.append((time.perf_counter_ns(), request["cmd"], tag))
+
+    # slot -> session (None while a new game is requested)
+    active = [None] * sessions
+    for slot in range(sessions):
+        send({"cmd": "new", "seed": rng.next64()}, slot)
+
+    sent     = 0
+    received = 0
+    finished = 0
+    closed   = set() # finished sessions, moves still in flight fail
+    turn     = 0
+    while(received < requests or inFlight):
+        # fill pipeline with moves of games which are ready
+        while(sent < requests and len(inFlight) < pipeline):
+            ready = [session for session in active if session is not None]
+            if(not ready): break
+            turn += 1
+            session = ready[turn % len(ready)]
+            send({"cmd": "move", "session": session,
+                  "direction": rng.randrange(4)}, session)
+            sent += 1
+        await writer.drain()
+
+        response = json.loads(await reader.readline())
+        start, command, tag = inFlight.popleft()
+        if(command == "new"):
+            active[tag] = response["session"]
+            continue
+        if(command == "close"):
+            continue
+
+        latency.add(time.perf_counter_ns() - start)
+        received += 1
+        if(not response.get("ok")):
+            if(tag in closed): continue
+            raise RuntimeError("server error: %s" % response.get("error"))
+
+        # replace finished game by a new one
+        if(response["finished"] and tag not in closed):
+            closed.add(tag)
+            finished += 1
+            slot = active.index(tag)
+            active[slot] = None
+            send({"cmd": "close", "session": tag}, tag)
+            if(sent < requests):
+                send({"cmd": "new", "seed": rng.next64()}, slot)
+
+    for session in active:
+        if(session is not None):
+            send({"cmd": "close", "session": session}, session)
+    await writer.drain()
+    for i in range(len(inFlight)):
+        await reader.readline()
+    writer.close()
+    return finished
+
+
+async def generateLoad(connect, connections, sessions, requests, pipeline, seed):
+    latency = Histogram()
+    start   = time.perf_counter()
+    perConnection = requests // connections
+    finished = await asyncio.gather(*[
+        runConnection(connect, perConnection, sessions, pipeline, seed + i,
+                      latency)
+        for i in range(connections)])
+    seconds = time.perf_counter() - start
+    total   = perConnection * connections
+    print("requests %d  seconds %.2f  requests/s %.0f  p50 %.1f us  "
+          "p99 %.1f us  games finished %d"
+          % (total, seconds, total / seconds, latency.percentile(50) / 1e3,
+             latency.percentile(99) / 1e3, sum(finished)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate load on a game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=10,
+                        help="games per connection")
+    parser.add_argument("--requests", type=int, default=100000,
+                        help="number of moves (all connections)")
+    parser.add_argument("--pipeline", type=int, default=16,
+                        help="requests in flight per connection")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if(args.unix is not None):
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+    asyncio.run(generateLoad(connect, args.connections, args.sessions,
+                             args.requests, args.pipeline, args.seed))
+
+
+if(__name__ == "__main__"):
+    main()
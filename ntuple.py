@@ -0,0 +1,197 @@
+"""
+Class NTupleNetwork
+This class estimates the value of a board (expected score until end of game)
+as sum of weights in lookup tables. Every n-tuple (pattern) is a list of
+fields; the tile exponents in these fields form the index into the table of
+the pattern. Every pattern is applied in all 8 symmetric placements (see
+symmetry.py), so all placements share one table.
+
+Weights are stored in one flat array of 32-bit floats. A weight file can be
+opened read-only with mmap, so many processes using the same file share its
+pages instead of copying the weights:
+
+    network   = NTupleNetwork.open("2048ntuple.weights")
+    direction = network.bestMove(board)
+
+File format (little endian):
+Header:   magic "2048NTUP", version, number of patterns
+Patterns: 8 bytes per pattern (fields 0..15, unused bytes 0xFF)
+Weights:  starting at offset WEIGHTS_ALIGN, 16**len(pattern) floats per
+          pattern
+"""
+
+from array import array
+import mmap
+import os
+import struct
+import sys
+
+import bitboard
+from symmetry import TRANSFORMS, transformBoard
+
+FILENAME_WEIGHTS = "2048ntuple.weights"
+
+MAGIC   = b"2048NTUP"
+VERSION = 1
+
+HEADER  = struct.Struct("<8sHH4x")
+PATTERN = struct.Struct("<8B")
+WEIGHTS_ALIGN = 4096 # weights start at a page boundary
+
+# patterns (fields 4*y+x): fast but small network with 4-tuples (rows and
+# squares) and a larger network with 6-tuples (256 MB of weights)
+NETWORKS = {"small": [(0, 1, 2, 3), (4, 5, 6, 7),
+                      (0, 1, 4, 5), (1, 2, 5, 6), (5, 6, 9, 10)],
+            "large": [(0, 1, 2, 3, 4, 5), (4, 5, 6, 7, 8, 9),
+                      (0, 1, 2, 4, 5, 6), (4, 5, 6, 8, 9, 10)]}
+
+
+def placements(pattern):
+    """
+    This function returns all different placements of a pattern under the
+    8 symmetries, each as list of bit positions in a bitboard.
+    """
+    result = []
+    for t in range(TRANSFORMS):
+        cells = tuple(transformBoard(0xF << 4*cell, t).bit_length() // 4 - 1
+                      for cell in pattern)
+        if(cells not in result):
+            result.append(cells)
+    return [[4*cell for cell in cells] for cells in result]
+
+
+class NTupleNetwork:
+    def __init__(self, patterns=NETWORKS["small"], weights=None):
+        self.patterns = [tuple(pattern) for pattern in patterns]
+
+        # per placement: offset of table of its pattern, bit positions
+        self.placements = []
+        size = 0
+        for pattern in self.patterns:
+            for shifts in placements(pattern):
+                self.placements.append((size, shifts))
+            size += 16 ** len(pattern)
+
+        # weights: array (writable) or memoryview of a read-only file
+        self.weights = weights if weights is not None else array("f", bytes(4*size))
+        if(len(self.weights) != size):
+            raise ValueError("network needs %d weights, got %d"
+                             % (size, len(self.weights)))
+        self.map  = None
+        self.file = None
+
+    def features(self, board):
+        """
+        This function returns indices of all weights which belong to passed
+        bitboard (one per placement).
+        """
+        features = []
+        for offset, shifts in self.placements:
+            index = 0
+            for shift in shifts:
+                index = index << 4 | (board >> shift) & 0xF
+            features.append(offset + index)
+        return features
+
+    def value(self, features):
+        weights = self.weights
+        return sum(weights[i] for i in features)
+
+    def evaluate(self, board):
+        """
+        This function returns estimated value of a bitboard.
+        """
+        return self.value(self.features(board))
+
+    def update(self, features, delta):
+        """
+        This function adds delta to all weights of passed features.
+        """
+        weights = self.weights
+        for i in features:
+            weights[i] += delta
+
+    def bestAfterstate(self, board):
+        """
+        This function returns (value, direction, afterstate, reward,
+        features of afterstate) of the best move of a bitboard (value is
+        reward plus estimated value of afterstate) or None when no move is
+        possible.
+        """
+        best = None
+        for direction in range(4):
+            afterstate, reward = bitboard.move(board, direction)
+            if(afterstate == board): continue
+            features = self.features(afterstate)
+            value    = reward + self.value(features)
+            if(best is None or value > best[0]):
+                best = (value, direction, afterstate, reward, features)
+        return best
+
+    def bestMove(self, board):
+        """
+        This function returns the best direction for a bitboard (None when
+        no move is possible).
+        """
+        best = self.bestAfterstate(board)
+        return best[1] if best is not None else None
+
+    def save(self, filename):
+        """
+        This function writes patterns and weights to a temporary file which
+        atomically replaces passed file (readers never see a half-written
+        file).
+        """
+        temporary = filename + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.patterns)))
+            for pattern in self.patterns:
+                f.write(PATTERN.pack(*(pattern + (0xFF,)*(8-len(pattern)))))
+            f.write(bytes(WEIGHTS_ALIGN - f.tell()))
+            weights = array("f", self.weights)
+            if(sys.byteorder == "big"): weights.byteswap()
+            weights.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, filename)
+
+    @classmethod
+    def open(cls, filename, writable=False):
+        """
+        This function loads a network from file. Read-only networks use the
+        memory-mapped file directly; writable ones (for training) get a copy
+        of the weights.
+        """
+        with open(filename, "rb") as f:
+            data = f.read(WEIGHTS_ALIGN)
+            magic, version, count = HEADER.unpack_from(data, 0)
+            if(magic != MAGIC or version != VERSION):
+                raise ValueError("%s is not a weight file (version %d)"
+                                 % (filename, VERSION))
+            patterns = [tuple(cell for cell in PATTERN.unpack_from(
+                                  data, HEADER.size + i*PATTERN.size)
+                              if cell != 0xFF)
+                        for i in range(count)]
+
+            if(writable or sys.byteorder == "big"):
+                f.seek(WEIGHTS_ALIGN)
+                weights = array("f", f.read())
+                if(sys.byteorder == "big"): weights.byteswap()
+                return cls(patterns, weights)
+
+            map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        network = cls(patterns, memoryview(map)[WEIGHTS_ALIGN:].cast("f"))
+        network.map = map
+        return network
+
+    def close(self):
+        if(self.map is not None):
+            self.weights.release()
+            self.map.close()
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,223 @@
+"""
+Profiling
+This module measures how long hot functions of game and UI take. It is
+switched off by default; nothing is wrapped then, so there is no overhead.
+
+When switched on (python 2048.py --profile, or environment variable
+PROFILE_2048=1) the functions in INSTRUMENTED are replaced by wrappers which
+record duration of every call in a histogram (buckets are powers of two
+nanoseconds, so adding a value is one bit_length()). A summary is printed on
+exit and when KEYS_DUMP_PROFILE is pressed.
+
+Optionally a session can be written as
+ - Chrome trace (--trace FILE / PROFILE_2048_TRACE=FILE), open it with
+   chrome://tracing or https://ui.perfetto.dev
+ - cProfile statistics (--cprofile FILE / PROFILE_2048_CPROFILE=FILE), open
+   it with python -m pstats FILE
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# module -> class -> functions which are measured
+INSTRUMENTED = {"game": {"Game": ["move", "insertRandomNumber", "isFinished"]},
+                "ui":   {"UI":   ["show", "setWindowSize", "keyPressed",
+                                  "processResize"]}}
+
+MAX_TRACE_EVENTS = 1000000 # about 100 MB, further calls are not traced
+
+# profiler of this process (None when profiling is switched off)
+active = None
+
+
+class Histogram:
+    """
+    Durations (nanoseconds) of calls of one function. Bucket i counts
+    durations d with d.bit_length() == i, i.e. 2**(i-1) <= d < 2**i.
+    """
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.count   = 0
+        self.total   = 0
+        self.max     = 0
+
+    def add(self, duration):
+        self.buckets[duration.bit_length()] += 1
+        self.count += 1
+        self.total += duration
+        if(duration > self.max): self.max = duration
+
+    def merge(self, other):
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max    = max(self.max, other.max)
+
+    def percentile(self, p):
+        """
+        This function returns an upper bound (nanoseconds) for the duration
+        which p percent of the calls did not exceed.
+        """
+        if(self.count == 0): return 0
+        limit = p / 100 * self.count
+        seen  = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if(seen >= limit):
+                return min(1 << i, self.max)
+        return self.max
+
+
+class Profiler:
+    def __init__(self, traceFile=None, cprofileFile=None):
+        self.histograms   = {}
+        self.traceFile    = traceFile
+        self.cprofileFile = cprofileFile
+        self.events       = [] if traceFile else None
+        self.dropped      = 0
+        self.start        = time.perf_counter_ns()
+        self.cprofile     = None
+
+        if(cprofileFile):
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def wrap(self, function, name):
+        """
+        This function returns a wrapper of function which records durations
+        (and trace events, when a trace file is written) under passed name.
+        """
+        histogram = self.histograms.setdefault(name, Histogram())
+        clock     = time.perf_counter_ns
+        events    = self.events
+
+        if(events is None):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.add(clock() - start)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    duration = clock() - start
+                    histogram.add(duration)
+                    if(len(events) < MAX_TRACE_EVENTS):
+                        events.append((name, start, duration,
+                                       threading.get_ident()))
+                    else:
+                        self.dropped += 1
+        return wrapper
+
+    def instrument(self, owner, names, prefix=None):
+        """
+        This function replaces functions of owner (a class, or a single
+        object like the Tk root) by measuring wrappers.
+        """
+        if(prefix is None):
+            prefix = owner.__name__ if isinstance(owner, type) else type(owner).__name__
+        for name in names:
+            function = getattr(owner, name)
+            setattr(owner, name, self.wrap(function, prefix + "." + name))
+
+    def summary(self):
+        """
+        This function returns a table with count and durations of all
+        measured functions (slowest total first).
+        """
+        lines = ["%-26s %9s %11s %10s %10s %10s %10s" % (
+                 "function", "calls", "total [ms]", "mean [us]", "p50 [us]",
+                 "p99 [us]", "max [us]")]
+        for name, histogram in sorted(self.histograms.items(),
+                                      key=lambda item: -item[1].total):
+            if(histogram.count == 0): continue
+            lines.append("%-26s %9d %11.1f %10.1f %10.1f %10.1f %10.1f" % (
+                name, histogram.count, histogram.total / 1e6,
+                histogram.total / histogram.count / 1e3,
+                histogram.percentile(50) / 1e3,
+                histogram.percentile(99) / 1e3,
+                histogram.max / 1e3))
+        if(self.dropped):
+            lines.append("(%d calls not traced, trace is full)" % self.dropped)
+        return "\n".join(lines)
+
+    def writeTrace(self, filename):
+        """
+        This function writes recorded calls in Chrome trace event format.
+        """
+        pid = os.getpid()
+        with open(filename, "w") as f:
+            json.dump({"displayTimeUnit": "ms",
+                       "traceEvents": [
+                           {"name": name, "ph": "X", "pid": pid, "tid": tid,
+                            "ts":  (start - self.start) / 1e3,
+                            "dur": duration / 1e3}
+                           for name, start, duration, tid in self.events]}, f)
+
+    def dump(self, file=None):
+        """
+        This function prints summary (to stderr by default) and writes trace
+        and cProfile files (if requested).
+        """
+        print(self.summary(), file=file or sys.stderr)
+        if(self.traceFile):
+            self.writeTrace(self.traceFile)
+        if(self.cprofile is not None):
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofileFile)
+            self.cprofile.enable()
+
+    def stop(self):
+        if(self.cprofile is not None):
+            self.cprofile.disable()
+            self.cprofile = None
+
+
+def enable(traceFile=None, cprofileFile=None):
+    """
+    This function switches on profiling for this process: functions in
+    INSTRUMENTED are wrapped and summary is dumped on exit. It has to be
+    called before a UI is created (key bindings use the functions).
+    """
+    global active
+    if(active is not None): return active
+
+    import importlib
+    active = Profiler(traceFile, cprofileFile)
+    for moduleName, classes in INSTRUMENTED.items():
+        module = importlib.import_module(moduleName)
+        for className, names in classes.items():
+            active.instrument(getattr(module, className), names)
+
+    def dumpOnExit():
+        active.dump()
+        active.stop()
+    atexit.register(dumpOnExit)
+    return active
+
+
+def enableFromEnvironment(profile=False, traceFile=None, cprofileFile=None):
+    """
+    This function switches on profiling when requested by arguments or by
+    environment variables PROFILE_2048, PROFILE_2048_TRACE and
+    PROFILE_2048_CPROFILE. It returns the profiler or None.
+    """
+    traceFile    = traceFile    or os.environ.get("PROFILE_2048_TRACE")
+    cprofileFile = cprofileFile or os.environ.get("PROFILE_2048_CPROFILE")
+    profile      = profile or os.environ.get("PROFILE_2048", "") not in ("", "0")
+    if(profile or traceFile or cprofileFile):
+        return enable(traceFile, cprofileFile)
+    return None
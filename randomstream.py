@@ -0,0 +1,83 @@
+"""
+Class RandomStream
+Random number generator with a 64-bit state (SplitMix64). It has the
+functions of random.Random which only need random numbers (randint,
+randrange, choice, shuffle, sample, uniform, ...), but not the state of the
+Mersenne Twister (about 2.5 KB) of random.Random.
+
+ - seedable: RandomStream(seed) always gives the same numbers
+ - small state: getstate()/setstate() use one integer (see snapshot.py)
+ - jump(n) skips n numbers in constant time, so parallel workers can use
+   parts of one stream which do not overlap:
+
+    stream = RandomStream(seed)
+    stream.jump(worker * 2**32)
+"""
+
+import os
+import random
+
+MASK64       = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+class RandomStream:
+    __slots__ = ("state", "gauss_next")
+
+    # functions of random.Random based on random() and getrandbits()
+    _randbelow = random.Random._randbelow_with_getrandbits
+    randrange  = random.Random.randrange
+    randint    = random.Random.randint
+    choice     = random.Random.choice
+    choices    = random.Random.choices
+    shuffle    = random.Random.shuffle
+    sample     = random.Random.sample
+    uniform    = random.Random.uniform
+    gauss      = random.Random.gauss
+
+    def __init__(self, seed=None):
+        self.seed(seed)
+
+    def seed(self, a=None, version=2):
+        """
+        This function sets state of generator (random seed when None).
+        """
+        if(a is None):
+            a = int.from_bytes(os.urandom(8), "little")
+        elif(not isinstance(a, int)):
+            raise TypeError("seed of RandomStream has to be an integer")
+        self.state = a & MASK64
+        self.gauss_next = None
+
+    def next64(self):
+        """
+        This function returns the next 64-bit number.
+        """
+        self.state = z = (self.state + GOLDEN_GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def random(self):
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k):
+        if(k <= 64):
+            return self.next64() >> (64 - k)
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self.next64() << shift
+        return bits & ((1 << k) - 1)
+
+    def getstate(self):
+        return self.state
+
+    def setstate(self, state):
+        self.state = state & MASK64
+        self.gauss_next = None
+
+    def jump(self, n):
+        """
+        This function skips the next n 64-bit numbers.
+        """
+        self.state = (self.state + n * GOLDEN_GAMMA) & MASK64
@@ -0,0 +1,210 @@
+#!/usr/bin/python3
+
+"""
+Tournament runner
+This module plays many complete games with a policy (random, greedy,
+solver or ntuple) in a pool of worker processes (one per core by default).
+Every finished game is written as one JSON line as soon as it is done:
+
+    {"game": 17, "seed": ..., "policy": "greedy", "score": 2412,
+     "round": 231, "maxTile": 256, "time": 0.0113}
+
+All seeds are derived from a master seed, so a run can be reproduced no
+matter how games are spread across workers. Only a few games are in flight
+at any time, so memory does not grow with number of games.
+
+    python runner.py --games 1000 --policy greedy --seed 1 --output results.jsonl
+
+Policy ntuple uses a trained weight file (see trainer.py), which all workers
+map read-only into memory (the weights are not copied per worker).
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import argparse
+import json
+import os
+import sys
+import time
+
+import bitboard
+from game import Game
+from ntuple import FILENAME_WEIGHTS
+from randomstream import RandomStream
+
+POLICIES = ["random", "greedy", "solver", "ntuple"]
+
+MASK64 = (1 << 64) - 1
+
+SOLVER_DEPTH = 2 # search depth of policy solver (about 1 ms per move)
+
+
+def gameSeed(masterSeed, index):
+    """
+    This function derives the seed of game number index from master seed
+    (SplitMix64 mixing, so neighbouring games get unrelated seeds).
+    """
+    z = (masterSeed * 0x9E3779B97F4A7C15 + (index+1) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def randomPolicy(game, rng):
+    """
+    Policy: try all directions in random order.
+    """
+    directions = [0, 1, 2, 3]
+    rng.shuffle(directions)
+    return directions
+
+
+def greedyPolicy(game, rng):
+    """
+    Policy: prefer directions which gain the highest score immediately.
+    """
+    try:
+        board = bitboard.fromField(game.field)
+    except OverflowError:
+        return [0, 1, 2, 3]
+    gained = [bitboard.move(board, direction)[1] for direction in range(4)]
+    return sorted(range(4), key=lambda direction: -gained[direction])
+
+
+# (game, solver): every game gets its own solver, so its transposition
+# table does not depend on games played before by same worker
+_solver = None
+
+def solverPolicy(game, rng, depth=SOLVER_DEPTH):
+    """
+    Policy: use direction found by expectimax search (see solver.py), other
+    directions are only tried when search finds no move. Search is bounded
+    by depth, not by time, so results can be reproduced on any machine.
+    """
+    global _solver
+    if(_solver is None or _solver[0] is not game):
+        from solver import Solver
+        _solver = (game, Solver(timeLimit=None, maxDepth=depth))
+    try:
+        best = _solver[1].bestMove(game)
+    except OverflowError:
+        best = None
+    return ([best] if best is not None else []) + [0, 1, 2, 3]
+
+
+_network = None
+
+def ntuplePolicy(game, rng, weights=FILENAME_WEIGHTS):
+    """
+    Policy: use direction with best value of trained n-tuple network (see
+    ntuple.py), weight file is opened once per worker.
+    """
+    global _network
+    if(_network is None):
+        from ntuple import NTupleNetwork
+        _network = NTupleNetwork.open(weights)
+    try:
+        best = _network.bestMove(bitboard.fromField(game.field))
+    except OverflowError:
+        best = None
+    return ([best] if best is not None else []) + [0, 1, 2, 3]
+
+
+def policyDirections(policy, game, rng, depth=SOLVER_DEPTH, weights=FILENAME_WEIGHTS):
+    """
+    This function returns the directions which passed policy wants to try
+    (in this order) for current state of game.
+    """
+    if(policy == "random"):
+        return randomPolicy(game, rng)
+    elif(policy == "greedy"):
+        return greedyPolicy(game, rng)
+    elif(policy == "ntuple"):
+        return ntuplePolicy(game, rng, weights)
+    else:
+        return solverPolicy(game, rng, depth)
+
+
+def playGame(index, seed, policy, depth=SOLVER_DEPTH, weights=FILENAME_WEIGHTS):
+    """
+    This function plays one complete game (in a worker process) and returns
+    its result as dictionary.
+    """
+    start = time.perf_counter()
+
+    # game and policy get their own random number generators
+    rng  = RandomStream(seed ^ MASK64)
+    game = Game(useBitboard=True, rng=RandomStream(seed))
+
+    while(not game.isFinished()):
+        directions = policyDirections(policy, game, rng, depth, weights)
+        for direction in directions:
+            if(game.move(direction)): break
+
+    return {"game":    index,
+            "seed":    seed,
+            "policy":  policy,
+            "score":   game.score,
+            "round":   game.round,
+            "maxTile": max(max(row) for row in game.field),
+            "time":    round(time.perf_counter() - start, 6)}
+
+
+def runTournament(games, policy="random", masterSeed=0, workers=None,
+                  depth=SOLVER_DEPTH, weights=FILENAME_WEIGHTS):
+    """
+    This generator plays passed number of games in a process pool and yields
+    results in the order games finish. At most two games per worker are
+    submitted at the same time.
+    """
+    if(policy not in POLICIES):
+        raise ValueError("unknown policy %r (use one of %s)"
+                         % (policy, ", ".join(POLICIES)))
+    if(policy == "ntuple" and not os.path.exists(weights)):
+        raise FileNotFoundError("weight file %s does not exist (see trainer.py)"
+                                % weights)
+    workers = workers or os.cpu_count() or 1
+
+    # move tables are built once per worker, not within time of first game
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=bitboard.buildTables) as executor:
+        pending = set()
+        index   = 0
+        while(index < games or pending):
+            while(index < games and len(pending) < 2*workers):
+                pending.add(executor.submit(playGame, index,
+                                            gameSeed(masterSeed, index),
+                                            policy, depth, weights))
+                index += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many games of 2048.")
+    parser.add_argument("--games",   type=int, default=100)
+    parser.add_argument("--policy",  choices=POLICIES, default="random")
+    parser.add_argument("--seed",    type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--depth",   type=int, default=SOLVER_DEPTH,
+                        help="search depth of policy solver")
+    parser.add_argument("--weights", default=FILENAME_WEIGHTS,
+                        help="weight file for policy ntuple")
+    parser.add_argument("--output",  default="-",
+                        help="JSON Lines file (default: stdout)")
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for result in runTournament(args.games, args.policy, args.seed,
+                                    args.workers, args.depth,
+                                    args.weights):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if(output is not sys.stdout):
+            output.close()
+
+
+if(__name__ == "__main__"):
+    main()
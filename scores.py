@@ -0,0 +1,212 @@
+"""
+Class ScoreStore
+This class keeps results of games (score, max tile, rounds, timestamp).
+
+ - The file is read once per process; afterwards only lines appended by
+   other processes are read (refresh()).
+ - New results are appended to the file (one line per game). When the file
+   holds many more lines than needed for the leaderboard, it is compacted:
+   best results are written to a temporary file which atomically replaces
+   the old one.
+ - Appending and compacting is done while holding a lock file, so many
+   processes can use the same file at the same time.
+ - Best results are kept sorted in memory (top(n) does not read the file).
+
+Use getStore(filename) to share one store per file within a process.
+"""
+
+from bisect import insort
+from collections import namedtuple
+import os
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+LEADERBOARD_SIZE = 100
+COMPACT_FACTOR   = 4 # compact when file has 4 times more lines than needed
+
+Result = namedtuple("Result", ["score", "maxTile", "rounds", "timestamp"])
+
+
+class FileLock:
+    """
+    Exclusive lock (across processes) using a lock file.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __enter__(self):
+        self.file = open(self.filename, "a+b")
+        if(fcntl is not None):
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            while(True):
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass # LK_LOCK gives up after 10 seconds, try again
+        return self
+
+    def __exit__(self, *args):
+        if(fcntl is not None):
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+
+
+def parseLine(line):
+    """
+    This function converts one line of the score file into a Result (None
+    for broken lines, e.g. when a process died while writing).
+    """
+    try:
+        score, maxTile, rounds, timestamp = (int(value) for value in line.split())
+    except ValueError:
+        return None
+    return Result(score, maxTile, rounds, timestamp)
+
+
+def formatLine(result):
+    return "%d\t%d\t%d\t%d\n" % tuple(result)
+
+
+class ScoreStore:
+    def __init__(self, filename, legacyFilename=None,
+                 leaderboardSize=LEADERBOARD_SIZE):
+        self.filename        = filename
+        self.lock            = FileLock(filename + ".lock")
+        self.leaderboardSize = leaderboardSize
+
+        # best results, sorted descending by key (score, maxTile, rounds)
+        self.leaderboard = []
+        # position in file up to which lines have been read
+        self.offset = 0
+        self.fileId = None
+        self.lines  = 0
+
+        if(legacyFilename is not None and not os.path.exists(filename)):
+            self.importLegacy(legacyFilename)
+        self.refresh()
+
+    def importLegacy(self, legacyFilename):
+        """
+        This function takes over the highscore from old highscore file (one
+        number) when there is no score file yet.
+        """
+        try:
+            with open(legacyFilename, "r") as f:
+                highscore = int(f.readlines()[0].strip())
+            timestamp = int(os.path.getmtime(legacyFilename))
+        except (OSError, ValueError, IndexError):
+            return
+        with self.lock:
+            if(not os.path.exists(self.filename)):
+                with open(self.filename, "a") as f:
+                    f.write(formatLine(Result(highscore, 0, 0, timestamp)))
+
+    def insert(self, result):
+        """
+        This function inserts a result into leaderboard (only best results
+        are kept).
+        """
+        key = (-result.score, -result.maxTile, -result.rounds, result.timestamp)
+        if(len(self.leaderboard) >= self.leaderboardSize and
+           key >= self.leaderboard[-1][0]):
+            return
+        insort(self.leaderboard, (key, result))
+        if(len(self.leaderboard) > self.leaderboardSize):
+            self.leaderboard.pop()
+
+    def refresh(self):
+        """
+        This function reads lines which have been appended (by any process)
+        since last call. When the file has been replaced (compacted), it is
+        read again from the beginning.
+        """
+        try:
+            with open(self.filename, "rb") as f:
+                stat   = os.fstat(f.fileno())
+                fileId = (stat.st_dev, stat.st_ino)
+                if(fileId != self.fileId or stat.st_size < self.offset):
+                    self.leaderboard = []
+                    self.offset = 0
+                    self.lines  = 0
+                    self.fileId = fileId
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        # ignore incomplete last line, it will be read next time
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("ascii", "replace").splitlines():
+            result = parseLine(line)
+            if(result is not None):
+                self.insert(result)
+                self.lines += 1
+        self.offset += end
+
+    def add(self, score, maxTile, rounds, timestamp=None):
+        """
+        This function appends a result to the file and inserts it into
+        leaderboard. Sometimes the file is compacted afterwards.
+        """
+        result = Result(score, maxTile, rounds,
+                        int(time.time()) if timestamp is None else timestamp)
+        with self.lock:
+            with open(self.filename, "ab") as f:
+                f.write(formatLine(result).encode("ascii"))
+            self.refresh()
+            if(self.lines > COMPACT_FACTOR * self.leaderboardSize):
+                self.compact()
+        return result
+
+    def compact(self):
+        """
+        This function replaces the file by a file with only the best results
+        (written to a temporary file first, then renamed atomically). Lock
+        has to be held by caller.
+        """
+        self.refresh()
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w") as f:
+            for key, result in self.leaderboard:
+                f.write(formatLine(result))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.filename)
+        self.fileId = None
+        self.refresh()
+
+    def highscore(self):
+        """
+        This function returns the best score (0 if there is none).
+        """
+        return self.leaderboard[0][1].score if self.leaderboard else 0
+
+    def top(self, n=10):
+        """
+        This function returns the n best results (best first).
+        """
+        return [result for key, result in self.leaderboard[:n]]
+
+
+_stores = {}
+
+def getStore(filename, legacyFilename=None):
+    """
+    This function returns the store of passed file (one per process).
+    """
+    store = _stores.get(filename)
+    if(store is None):
+        store = ScoreStore(filename, legacyFilename)
+        _stores[filename] = store
+    return store
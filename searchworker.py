@@ -0,0 +1,111 @@
+"""
+Class SearchWorker
+This class runs move searches (see solver.py) on a background thread, so a
+frontend stays responsive while searching. Requests and results are passed
+through queues; results are never delivered on the worker thread, the
+frontend fetches them with poll() (e.g. from a timer of its main loop):
+
+    worker     = SearchWorker()
+    generation = worker.search(game.field, game.probability4)
+    ...
+    result = worker.poll() # None or (generation, direction)
+
+Every request gets a new generation number. A new request or cancel() stops
+the running search (it is stale now) and results of older generations are
+dropped, so poll() only returns results for the current state. Tables of
+bitboard and solver are built on the worker thread before the first request
+is searched.
+"""
+
+import queue
+import threading
+
+import bitboard
+import solver
+from solver import Solver
+
+HINT_TIME_LIMIT = 0.2 # seconds per search
+
+
+class SearchWorker:
+    def __init__(self, timeLimit=HINT_TIME_LIMIT):
+        self.timeLimit  = timeLimit
+        self.solver     = Solver(timeLimit=timeLimit)
+        self.generation = 0
+
+        # requests: (generation, field, probability4, time limit) or None
+        # to stop, results: (generation, direction)
+        self.requests = queue.Queue()
+        self.results  = queue.Queue()
+
+        self.thread = threading.Thread(target=self.run, name="SearchWorker",
+                                       daemon=True)
+        self.thread.start()
+
+    def search(self, field, probability4=10, timeLimit=None):
+        """
+        This function requests a search for passed field (a copy is searched)
+        and returns generation number of the request. A running search is
+        cancelled.
+        """
+        self.cancel()
+        if(timeLimit is None): timeLimit = self.timeLimit
+        self.requests.put((self.generation, [row[:] for row in field],
+                           probability4, timeLimit))
+        return self.generation
+
+    def cancel(self):
+        """
+        This function makes all pending and running searches stale. The
+        running search stops at its next time check.
+        """
+        self.generation = self.solver.cancel()
+
+    def poll(self):
+        """
+        This function returns (generation, direction) of the current search
+        when it is done, otherwise None. Direction is None when no move is
+        possible (or the board can't be searched).
+        """
+        result = None
+        while(True):
+            try:
+                generation, direction = self.results.get_nowait()
+            except queue.Empty:
+                return result
+            if(generation == self.generation):
+                result = (generation, direction)
+
+    def run(self):
+        """
+        Main loop of worker thread: only the newest request is searched,
+        older ones waiting in queue are skipped.
+        """
+        bitboard.buildTables()
+        solver.buildHeuristicTable()
+
+        while(True):
+            request = self.requests.get()
+            while(request is not None and not self.requests.empty()):
+                request = self.requests.get_nowait()
+            if(request is None): break
+
+            generation, field, probability4, timeLimit = request
+            if(generation != self.generation): continue
+
+            self.solver.probability4 = probability4
+            try:
+                direction = self.solver.bestMove(field, timeLimit,
+                                                 generation=generation)
+            except Exception: # board is not 4x4, tiles are too large, ...
+                # worker thread keeps running, frontend gets no move
+                direction = None
+            if(generation == self.generation):
+                self.results.put((generation, direction))
+
+    def close(self):
+        """
+        This function stops the worker thread.
+        """
+        self.cancel()
+        self.requests.put(None)
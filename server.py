@@ -0,0 +1,270 @@
+#!/usr/bin/python3
+
+"""
+Game server
+This script hosts many games (class Game) in one process. Clients connect
+via TCP or a Unix socket and send one JSON request per line; every request
+gets one JSON response line (in the same order, so requests can be sent
+without waiting for responses):
+
+    {"id": 1, "cmd": "new", "seed": 7}
+    {"id": 1, "ok": true, "session": 1, "field": [[0, 2, 0, 0], ...],
+     "score": 0, "round": 0, "finished": false}
+    {"id": 2, "cmd": "move", "session": 1, "direction": 3}
+    {"id": 2, "ok": true, "session": 1, "moved": true, "field": ...}
+
+Commands: new (optional seed and size), move (direction 0,1,2,3 = N,E,S,W),
+state, undo, close and stats. Errors are answered with "ok": false and
+"error". The "id" of a request is passed back unchanged.
+
+Sessions which are not used for --idle-timeout seconds are closed. When a
+client does not read its responses, the server stops reading its requests
+(backpressure) instead of buffering responses. Requests per second and
+processing latency (p50/p99) are reported every --report seconds.
+
+    python server.py [--port 2048 | --unix PATH] [--idle-timeout 300]
+
+See loadgen.py for a client which generates load.
+"""
+
+from collections import OrderedDict
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import bitboard
+from game import Game
+from profiling import Histogram
+from randomstream import RandomStream
+
+PORT          = 2048
+IDLE_TIMEOUT  = 300    # seconds
+MAX_SESSIONS  = 100000
+MAX_SIZE      = 16     # largest board (size x size) of a session
+REPORT_TIME   = 5      # seconds
+LINE_LIMIT    = 4096   # maximum length of a request (bytes)
+HIGH_WATER    = 64 * 1024 # unsent bytes per connection before waiting
+
+
+class GameServer:
+    def __init__(self, idleTimeout=IDLE_TIMEOUT, maxSessions=MAX_SESSIONS):
+        self.idleTimeout = idleTimeout
+        self.maxSessions = maxSessions
+
+        # session id -> (game, time of last use), least recently used first
+        self.sessions  = OrderedDict()
+        self.nextId    = 1
+
+        # statistics since last report
+        self.requests    = 0
+        self.latency     = Histogram()
+        self.evicted     = 0
+        self.connections = 0
+
+        self.commands = {"new":   self.commandNew,
+                         "move":  self.commandMove,
+                         "state": self.commandState,
+                         "undo":  self.commandUndo,
+                         "close": self.commandClose,
+                         "stats": self.commandStats}
+
+    def getGame(self, request):
+        """
+        This function returns the game of the session of a request and marks
+        the session as used.
+        """
+        session = request.get("session")
+        entry   = self.sessions.get(session)
+        if(entry is None):
+            raise KeyError("unknown session %r" % (session,))
+        self.sessions[session] = (entry[0], time.monotonic())
+        self.sessions.move_to_end(session)
+        return entry[0]
+
+    @staticmethod
+    def state(session, game):
+        return {"session":  session,
+                "field":    game.field,
+                "score":    game.score,
+                "round":    game.round,
+                "finished": game.isFinished()}
+
+    def commandNew(self, request):
+        if(len(self.sessions) >= self.maxSessions):
+            raise OverflowError("too many sessions")
+        seed = request.get("seed")
+        size = request.get("size", 4)
+        if(not isinstance(size, int) or not 2 <= size <= MAX_SIZE):
+            raise ValueError("size has to be between 2 and %d" % MAX_SIZE)
+        game = Game(useBitboard=True, rng=RandomStream(seed), size=size)
+        session = self.nextId
+        self.nextId += 1
+        self.sessions[session] = (game, time.monotonic())
+        return self.state(session, game)
+
+    def commandMove(self, request):
+        direction = request.get("direction")
+        if(direction not in (0, 1, 2, 3)):
+            raise ValueError("direction has to be 0, 1, 2 or 3")
+        game  = self.getGame(request)
+        moved = game.move(direction)
+        response = self.state(request["session"], game)
+        response["moved"] = moved
+        return response
+
+    def commandState(self, request):
+        return self.state(request["session"], self.getGame(request))
+
+    def commandUndo(self, request):
+        game   = self.getGame(request)
+        undone = game.undo()
+        response = self.state(request["session"], game)
+        response["undone"] = undone
+        return response
+
+    def commandClose(self, request):
+        self.getGame(request)
+        del self.sessions[request["session"]]
+        return {"session": request["session"]}
+
+    def commandStats(self, request):
+        return {"sessions":    len(self.sessions),
+                "connections": self.connections,
+                "evicted":     self.evicted}
+
+    def handle(self, line):
+        """
+        This function answers one request line and returns the response
+        line (bytes).
+        """
+        try:
+            request = json.loads(line)
+            if(not isinstance(request, dict)):
+                raise ValueError("request has to be a JSON object")
+        except ValueError as e:
+            return (json.dumps({"ok": False, "error": "invalid request: %s" % e})
+                    + "\n").encode()
+
+        command = self.commands.get(request.get("cmd"))
+        try:
+            if(command is None):
+                raise ValueError("unknown command %r" % (request.get("cmd"),))
+            response = command(request)
+            response["ok"] = True
+        except (KeyError, ValueError, TypeError, OverflowError) as e:
+            response = {"ok": False, "error": str(e.args[0]) if e.args else str(e)}
+        if("id" in request):
+            response["id"] = request["id"]
+        return (json.dumps(response) + "\n").encode()
+
+    async def serveClient(self, reader, writer):
+        """
+        This function handles one connection: requests are answered in
+        order. When the client does not read responses, reading requests
+        waits until buffered responses are sent (backpressure).
+        """
+        self.connections += 1
+        transport = writer.transport
+        try:
+            while(True):
+                try:
+                    line = await reader.readline()
+                except ValueError: # line longer than LINE_LIMIT
+                    writer.write(b'{"ok": false, "error": "request too long"}\n')
+                    break
+                if(not line): break
+                if(not line.strip()): continue
+
+                start = time.perf_counter_ns()
+                writer.write(self.handle(line))
+                self.latency.add(time.perf_counter_ns() - start)
+                self.requests += 1
+
+                if(transport.get_write_buffer_size() > HIGH_WATER):
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def evictIdle(self):
+        """
+        This function closes sessions which have not been used for
+        idleTimeout seconds (sessions are ordered by last use).
+        """
+        limit = time.monotonic() - self.idleTimeout
+        while(self.sessions):
+            session, (game, used) = next(iter(self.sessions.items()))
+            if(used > limit): break
+            del self.sessions[session]
+            self.evicted += 1
+
+    async def maintain(self, reportTime=REPORT_TIME, output=sys.stderr):
+        """
+        This coroutine evicts idle sessions and reports statistics every
+        reportTime seconds.
+        """
+        last = time.perf_counter()
+        while(True):
+            await asyncio.sleep(reportTime)
+            self.evictIdle()
+            now = time.perf_counter()
+            print("sessions %6d  connections %4d  requests/s %8.0f  "
+                  "p50 %6.1f us  p99 %6.1f us  evicted %d"
+                  % (len(self.sessions), self.connections,
+                     self.requests / (now - last),
+                     self.latency.percentile(50) / 1e3,
+                     self.latency.percentile(99) / 1e3, self.evicted),
+                  file=output, flush=True)
+            last          = now
+            self.requests = 0
+            self.latency  = Histogram()
+
+
+async def serve(host="127.0.0.1", port=PORT, unix=None,
+                idleTimeout=IDLE_TIMEOUT, maxSessions=MAX_SESSIONS,
+                reportTime=REPORT_TIME):
+    gameServer = GameServer(idleTimeout, maxSessions)
+    # tables are built before first request, otherwise its latency would
+    # include building them
+    bitboard.buildTables()
+    if(unix is not None):
+        server = await asyncio.start_unix_server(gameServer.serveClient, unix,
+                                                 limit=LINE_LIMIT)
+    else:
+        server = await asyncio.start_server(gameServer.serveClient, host, port,
+                                            limit=LINE_LIMIT)
+    maintenance = asyncio.ensure_future(gameServer.maintain(reportTime))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        maintenance.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host games of 2048.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on Unix socket instead of TCP")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="seconds until unused sessions are closed")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--report", type=float, default=REPORT_TIME,
+                        help="seconds between statistics reports")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.idle_timeout,
+                          args.max_sessions, args.report))
+    except KeyboardInterrupt:
+        pass
+
+
+if(__name__ == "__main__"):
+    main()
@@ -0,0 +1,166 @@
+"""
+Snapshots
+This module saves and loads game states in a compact binary format. A file
+starts with a header followed by any number of records of same size, so
+record i can be read directly at offset HEADER.size + i*record size (the
+file is memory-mapped for reading).
+
+Header: magic "2048SNAP", version, record size, board size (0 = 4)
+Record: size*size tile exponents (0 = empty), score, round, probability4
+        and state of the random number generator of the game (64-bit state
+        of a RandomStream, see randomstream.py) - 36 bytes for 4x4 boards
+
+All games in one file have the same board size, all numbers are little
+endian.
+
+    appendSnapshot("games.bin", game)
+    with SnapshotReader("games.bin") as snapshots:
+        snapshots.restore(len(snapshots)-1, game)
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+import mmap
+import os
+import struct
+
+from randomstream import RandomStream
+
+MAGIC   = b"2048SNAP"
+VERSION = 2
+
+HEADER = struct.Struct("<8sHHB3x")
+
+
+@lru_cache(maxsize=None)
+def recordStruct(size):
+    """
+    This function returns the struct of one record for boards of passed size.
+    """
+    return struct.Struct("<%dBIIBB2xQ" % (size*size))
+
+RECORD = recordStruct(4)
+
+# flags of a record
+FLAG_RANDOM_STATE = 1 # state of random number generator is stored
+
+Snapshot = namedtuple("Snapshot", ["field", "score", "round",
+                                   "probability4", "randomState"])
+
+
+def pack(game):
+    """
+    This function returns one record (bytes) for passed game. State of the
+    random number generator can only be stored when the game uses a
+    RandomStream (which is default).
+    """
+    exponents = [number.bit_length()-1 if number else 0
+                 for row in game.field for number in row]
+    record    = recordStruct(game.size)
+
+    if(isinstance(game.rng, RandomStream)):
+        flags, randomState = FLAG_RANDOM_STATE, game.rng.getstate()
+    else:
+        flags, randomState = 0, 0
+    return record.pack(*exponents, game.score, game.round, game.probability4,
+                       flags, randomState)
+
+
+def unpack(record, size=4):
+    """
+    This function converts one record (bytes) into a Snapshot.
+    """
+    cells  = size*size
+    values = recordStruct(size).unpack(record)
+    field  = [[(1 << e) if e else 0 for e in values[i:i+size]]
+              for i in range(0, cells, size)]
+    score, round, probability4, flags, randomState = values[cells:]
+    if(not flags & FLAG_RANDOM_STATE):
+        randomState = None
+    return Snapshot(field, score, round, probability4, randomState)
+
+
+def appendSnapshot(filename, game):
+    """
+    This function appends a snapshot of passed game to file (which is
+    created when it does not exist yet). It returns index of the record.
+    Games of other board sizes than the ones in the file are rejected.
+    """
+    record = recordStruct(game.size)
+    with open(filename, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        if(f.tell() == 0):
+            f.write(HEADER.pack(MAGIC, VERSION, record.size, game.size))
+        else:
+            f.seek(0)
+            magic, version, recordSize, size = HEADER.unpack(f.read(HEADER.size))
+            if(magic != MAGIC or version != VERSION or
+               (size or 4) != game.size or recordSize != record.size):
+                raise ValueError("%s is not a snapshot file of %dx%d games"
+                                 % (filename, game.size, game.size))
+            f.seek(0, os.SEEK_END)
+        index = (f.tell() - HEADER.size) // record.size
+        f.write(pack(game))
+    return index
+
+
+class SnapshotReader:
+    """
+    This class gives random access to records of a snapshot file without
+    reading the whole file (memory-mapped).
+    """
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if(size < HEADER.size):
+            self.file.close()
+            raise ValueError("%s is not a snapshot file" % filename)
+
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, recordSize, boardSize = HEADER.unpack_from(self.map, 0)
+        self.size   = boardSize or 4 # files of older versions: always 4x4
+        self.record = recordStruct(self.size)
+        if(magic != MAGIC or version != VERSION or recordSize != self.record.size):
+            self.close()
+            raise ValueError("%s is not a snapshot file (version %d)"
+                             % (filename, VERSION))
+        self.count = (size - HEADER.size) // self.record.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if(index < 0): index += self.count
+        if(not 0 <= index < self.count):
+            raise IndexError("snapshot index out of range")
+        recordSize = self.record.size
+        offset     = HEADER.size + index*recordSize
+        return unpack(self.map[offset:offset+recordSize], self.size)
+
+    def restore(self, index, game):
+        """
+        This function loads snapshot index into passed game (including state
+        of random number generator when it has been stored). Size of game
+        has to be same as size of boards in file.
+        """
+        if(game.size != self.size):
+            raise ValueError("snapshots are %dx%d games, game is %dx%d"
+                             % (self.size, self.size, game.size, game.size))
+        snapshot = self[index]
+        game.setField(snapshot.field)
+        game.score        = snapshot.score
+        game.round        = snapshot.round
+        game.probability4 = snapshot.probability4
+        game.highscore    = max(game.highscore, game.score)
+        if(snapshot.randomState is not None):
+            game.rng = RandomStream(snapshot.randomState)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,278 @@
+"""
+Class Solver
+This class searches for a good move using expectimax search. Moves are max
+nodes, random numbers (inserted like Game.insertRandomNumber does) are chance
+nodes. Boards are handled as bitboards (see bitboard.py).
+
+ - iterative deepening: depth 1, 2, 3, ... is searched until time limit or
+   maximum depth is reached, result of last complete depth is used
+ - transposition table: values of chance nodes are cached (bounded, least
+   recently used entries are evicted). Values of symmetric boards are the
+   same, so with symmetric=True boards are stored in canonical form (see
+   symmetry.py) and one entry serves all 8 symmetric boards
+ - pruning: chance nodes which are reached with a cumulative probability
+   below a threshold are not expanded but evaluated
+
+Usage:
+
+    solver    = Solver(timeLimit=0.05)
+    direction = solver.bestMove(game) # or solver.bestMove(game.field)
+    print(solver.stats())
+"""
+
+from array import array
+from collections import OrderedDict
+import time
+
+import bitboard
+from symmetry import canonicalBoard
+
+# weights of heuristic (per row and column)
+SCORE_LOST_PENALTY        = 200000.0
+SCORE_MONOTONICITY_POWER  = 4.0
+SCORE_MONOTONICITY_WEIGHT = 47.0
+SCORE_SUM_POWER           = 3.5
+SCORE_SUM_WEIGHT          = 11.0
+SCORE_MERGES_WEIGHT       = 700.0
+SCORE_EMPTY_WEIGHT        = 270.0
+
+# heuristic table is built on first use, see buildHeuristicTable()
+_heuristic = None
+
+
+def buildHeuristicTable():
+    """
+    This function precomputes heuristic scores for all 65536 possible rows.
+    A row gets a higher score when it has empty fields, possible merges and
+    when its numbers are monotonic.
+    """
+    global _heuristic
+
+    table = array("d", bytes(8*65536))
+    for row in range(65536):
+        line = [row & 0xF, (row >> 4) & 0xF, (row >> 8) & 0xF, (row >> 12) & 0xF]
+
+        total   = 0.0
+        empty   = 0
+        merges  = 0
+        prev    = 0
+        counter = 0
+        for rank in line:
+            total += rank ** SCORE_SUM_POWER
+            if(rank == 0):
+                empty += 1
+            else:
+                if(prev == rank):
+                    counter += 1
+                elif(counter > 0):
+                    merges += 1 + counter
+                    counter = 0
+                prev = rank
+        if(counter > 0):
+            merges += 1 + counter
+
+        monotonicityLeft  = 0.0
+        monotonicityRight = 0.0
+        for i in range(1, 4):
+            a = line[i-1] ** SCORE_MONOTONICITY_POWER
+            b = line[i]   ** SCORE_MONOTONICITY_POWER
+            if(line[i-1] > line[i]):
+                monotonicityLeft  += a - b
+            else:
+                monotonicityRight += b - a
+
+        table[row] = (SCORE_LOST_PENALTY
+                      + SCORE_EMPTY_WEIGHT  * empty
+                      + SCORE_MERGES_WEIGHT * merges
+                      - SCORE_MONOTONICITY_WEIGHT * min(monotonicityLeft,
+                                                        monotonicityRight)
+                      - SCORE_SUM_WEIGHT * total)
+    _heuristic = table
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when time limit is exceeded.
+    """
+
+
+class Solver:
+    def __init__(self, timeLimit=0.1, maxDepth=8, cacheSize=200000,
+                 probabilityThreshold=0.0001, probability4=10, symmetric=False):
+        # budget per move (seconds, None = no limit) and maximum search depth
+        self.timeLimit = timeLimit
+        self.maxDepth  = maxDepth
+
+        # chance nodes below this cumulative probability are not expanded
+        self.probabilityThreshold = probabilityThreshold
+
+        # probability of fours in percent (same as Game.probability4)
+        self.probability4 = probability4
+
+        # transposition table: board -> (depth, value), symmetric boards
+        # share one entry when symmetric is set
+        self.cacheSize = cacheSize
+        self.cache     = OrderedDict()
+        self.symmetric = symmetric
+
+        # cancel() increments generation, a search stops when generation
+        # differs from the one it was started for
+        self.generation = 0
+
+        self.resetStats()
+
+    def resetStats(self):
+        """
+        This function resets all counters reported by stats().
+        """
+        self.nodes        = 0
+        self.cacheHits    = 0
+        self.cacheLookups = 0
+        self.evictions    = 0
+        self.searchTime   = 0.0
+        self.depth        = 0
+
+    def stats(self):
+        """
+        This function returns counters of all searches since last reset,
+        including nodes per second and hit rate of transposition table.
+        """
+        return {"nodes":          self.nodes,
+                "nodesPerSecond": self.nodes / self.searchTime
+                                  if self.searchTime else 0.0,
+                "cacheHitRate":   self.cacheHits / self.cacheLookups
+                                  if self.cacheLookups else 0.0,
+                "cacheSize":      len(self.cache),
+                "evictions":      self.evictions,
+                "searchTime":     self.searchTime,
+                "depth":          self.depth}
+
+    def bestMove(self, state, timeLimit=None, maxDepth=None, generation=None):
+        """
+        This function returns the best direction (0,1,2,3 = N,E,S,W) for a
+        Game or a field (4x4 list of numbers). None is returned when no move
+        is possible. Deeper searches are started as long as time limit
+        allows; the result of the deepest completed search is used.
+        Generation is the value of self.generation the search belongs to
+        (default: current value); when cancel() was called since, the search
+        stops at its first check.
+        A ValueError is raised for other board sizes, an OverflowError for
+        tiles which do not fit into a bitboard.
+        """
+        if(generation is None): generation = self.generation
+        self.searchGeneration = generation
+
+        if(hasattr(state, "field")):
+            self.probability4 = state.probability4
+            state = state.field
+        if(len(state) != 4 or any(len(row) != 4 for row in state)):
+            raise ValueError("solver needs a 4x4 field")
+        board = bitboard.fromField(state)
+
+        if(timeLimit is None): timeLimit = self.timeLimit
+        if(maxDepth  is None): maxDepth  = self.maxDepth
+        if(_heuristic is None): buildHeuristicTable()
+
+        start = time.perf_counter()
+        self.deadline = start + timeLimit if timeLimit is not None else None
+
+        best = None
+        try:
+            for depth in range(1, maxDepth+1):
+                best = self.__searchRoot(board, depth)
+                self.depth = depth
+                if(best is None): break # no move possible
+        except SearchTimeout:
+            # use result of last completed depth
+            if(best is None):
+                best = self.__anyMove(board)
+
+        self.searchTime += time.perf_counter() - start
+        return best
+
+    def cancel(self):
+        """
+        This function stops a running search (e.g. from another thread) at
+        its next time check, bestMove returns result of last completed depth.
+        Searches started for an older generation stop as well. The new
+        generation is returned.
+        """
+        self.generation += 1
+        return self.generation
+
+    def __anyMove(self, board):
+        for direction in range(4):
+            if(bitboard.move(board, direction)[0] != board):
+                return direction
+        return None
+
+    def __searchRoot(self, board, depth):
+        best      = None
+        bestValue = -1.0
+        for direction in range(4):
+            new = bitboard.move(board, direction)[0]
+            if(new == board): continue
+            value = self.__chanceNode(new, depth-1, 1.0)
+            if(value > bestValue):
+                best, bestValue = direction, value
+        return best
+
+    def __maxNode(self, board, depth, probability):
+        self.nodes += 1
+        if(self.nodes & 0xFF == 0 and
+           (self.generation != self.searchGeneration or
+            self.deadline is not None and time.perf_counter() > self.deadline)):
+            raise SearchTimeout()
+
+        best = 0.0 # no move possible: game is lost
+        for direction in range(4):
+            new = bitboard.move(board, direction)[0]
+            if(new == board): continue
+            best = max(best, self.__chanceNode(new, depth-1, probability))
+        return best
+
+    def __chanceNode(self, board, depth, probability):
+        if(depth <= 0 or probability < self.probabilityThreshold):
+            return self.evaluate(board)
+
+        # transposition table
+        self.cacheLookups += 1
+        key   = canonicalBoard(board)[0] if self.symmetric else board
+        entry = self.cache.get(key)
+        if(entry is not None and entry[0] >= depth):
+            self.cacheHits += 1
+            self.cache.move_to_end(key)
+            return entry[1]
+
+        empty = [shift for shift in range(0, 64, 4) if not (board >> shift) & 0xF]
+        p4 = self.probability4 / 100
+        p2 = 1 - p4
+        probability2 = probability * p2 / len(empty)
+        probability4 = probability * p4 / len(empty)
+
+        value = 0.0
+        for shift in empty:
+            value += p2 * self.__maxNode(board | (1 << shift), depth, probability2)
+            if(p4):
+                value += p4 * self.__maxNode(board | (2 << shift), depth, probability4)
+        value /= len(empty)
+
+        self.cache[key] = (depth, value)
+        self.cache.move_to_end(key)
+        if(len(self.cache) > self.cacheSize):
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def evaluate(self, board):
+        """
+        This function returns heuristic score of a board (sum of scores of
+        all rows and columns).
+        """
+        if(_heuristic is None): buildHeuristicTable()
+        h = _heuristic
+        t = bitboard.transpose(board)
+        return (h[board & 0xFFFF] + h[(board >> 16) & 0xFFFF] +
+                h[(board >> 32) & 0xFFFF] + h[(board >> 48) & 0xFFFF] +
+                h[t & 0xFFFF] + h[(t >> 16) & 0xFFFF] +
+                h[(t >> 32) & 0xFFFF] + h[(t >> 48) & 0xFFFF])
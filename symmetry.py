@@ -0,0 +1,203 @@
+"""
+Symmetry
+The board has 8 symmetries (rotations and mirrors). Moving a mirrored board
+to the mirrored direction gives the mirrored result, so results and values
+of one board can be reused for all of its symmetric boards.
+
+A transform t (0..7) is applied as follows: transpose the board (bit 2 of
+t), then mirror rows (bit 0, x -> n-1-x) and mirror columns (bit 1,
+y -> n-1-y).
+
+ - canonicalBoard(board) / canonicalField(field): smallest symmetric board
+   (representative of all 8 boards) and the transform leading to it
+ - DIRECTIONS[t][d]: direction on transformed board which corresponds to
+   direction d on the original board
+ - AfterstateCache: results of all four moves per canonical board (bounded,
+   least recently used entries are evicted)
+
+    cache = AfterstateCache()
+    newBoard, gained = cache.move(board, direction)
+"""
+
+from collections import OrderedDict
+
+import bitboard
+from game import slideLine
+
+TRANSFORMS = 8
+
+def transformDirection(t, d):
+    """
+    This function returns direction (0,1,2,3 = N,E,S,W) on a board
+    transformed by t which corresponds to direction d on the original board.
+    """
+    if(t & 4): d = 3 - d # transpose: N <-> W, E <-> S
+    if(t & 1 and d % 2 == 1): d = 4 - d # mirror rows: E <-> W
+    if(t & 2 and d % 2 == 0): d = 2 - d # mirror columns: N <-> S
+    return d
+
+DIRECTIONS = tuple(tuple(transformDirection(t, d) for d in range(4))
+                   for t in range(TRANSFORMS))
+
+# transform which undoes transform t
+INVERSE = tuple(((t & 1) << 1 | (t & 2) >> 1 | 4) if t & 4 else t
+                for t in range(TRANSFORMS))
+
+
+def mirrorRows(board):
+    """
+    This function mirrors every row of a bitboard: (y, x) -> (y, 3-x).
+    """
+    board = ((board & 0xF0F0F0F0F0F0F0F0) >> 4) | ((board & 0x0F0F0F0F0F0F0F0F) << 4)
+    return ((board & 0xFF00FF00FF00FF00) >> 8) | ((board & 0x00FF00FF00FF00FF) << 8)
+
+
+def mirrorColumns(board):
+    """
+    This function mirrors every column of a bitboard: (y, x) -> (3-y, x).
+    """
+    board = ((board & 0xFFFF0000FFFF0000) >> 16) | ((board & 0x0000FFFF0000FFFF) << 16)
+    return ((board >> 32) | (board << 32)) & 0xFFFFFFFFFFFFFFFF
+
+
+def transformBoard(board, t):
+    """
+    This function applies transform t to a bitboard.
+    """
+    if(t & 4): board = bitboard.transpose(board)
+    if(t & 1): board = mirrorRows(board)
+    if(t & 2): board = mirrorColumns(board)
+    return board
+
+
+def canonicalBoard(board):
+    """
+    This function returns the smallest of the 8 symmetric boards of passed
+    bitboard and the transform which leads to it.
+    """
+    m = mirrorRows(board)
+    t = bitboard.transpose(board)
+    u = mirrorRows(t)
+    boards = (board, m, mirrorColumns(board), mirrorColumns(m),
+              t, u, mirrorColumns(t), mirrorColumns(u))
+    canonical = min(boards)
+    return canonical, boards.index(canonical)
+
+
+def transformField(field, t):
+    """
+    This function applies transform t to a field (any size) and returns a
+    tuple of row tuples.
+    """
+    rows = zip(*field) if t & 4 else field
+    if(t & 1): rows = [row[::-1] for row in rows]
+    rows = tuple(tuple(row) for row in rows)
+    if(t & 2): rows = rows[::-1]
+    return rows
+
+
+def canonicalField(field):
+    """
+    This function returns the smallest of the 8 symmetric fields (tuple of
+    row tuples, usable as key) of passed field and the transform which leads
+    to it.
+    """
+    rows       = tuple(tuple(row) for row in field)
+    mirrored   = tuple(row[::-1] for row in rows)
+    transposed = tuple(zip(*rows))
+    both       = tuple(row[::-1] for row in transposed)
+    fields = (rows, mirrored, rows[::-1], mirrored[::-1],
+              transposed, both, transposed[::-1], both[::-1])
+    canonical = min(fields)
+    return canonical, fields.index(canonical)
+
+
+def moveField(field, direction):
+    """
+    This function moves a field (tuple of row tuples, any size) like
+    Game.move without inserting a new number. It returns new field (tuple
+    of row tuples) and gained score.
+    """
+    vertical = direction == 0 or direction == 2
+    reverse  = direction == 1 or direction == 2
+
+    lines  = zip(*field) if vertical else field
+    new    = []
+    gained = 0
+    for line in lines:
+        line, score = slideLine(tuple(line[::-1] if reverse else line))
+        new.append(line[::-1] if reverse else line)
+        gained += score
+    if(vertical): new = zip(*new)
+    return tuple(tuple(line) for line in new), gained
+
+
+class AfterstateCache:
+    """
+    This class caches afterstates (board after a move, before a new number
+    is inserted) and gained score of all four directions per canonical
+    board. All 8 symmetric boards share one entry.
+    """
+    def __init__(self, size=100000):
+        self.size    = size
+        self.entries = OrderedDict()
+
+        self.hits      = 0
+        self.lookups   = 0
+        self.evictions = 0
+
+    def lookup(self, key, compute):
+        """
+        This function returns the entry of a canonical board/field (computed
+        by compute(key) when it is not cached).
+        """
+        self.lookups += 1
+        entry = self.entries.get(key)
+        if(entry is not None):
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        entry = self.entries[key] = compute(key)
+        if(len(self.entries) > self.size):
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def moves(self, board):
+        """
+        This function returns [(new board, gained score), ...] of all four
+        directions of a bitboard.
+        """
+        canonical, t = canonicalBoard(board)
+        entry   = self.lookup(canonical, lambda key: tuple(
+                      bitboard.move(key, d) for d in range(4)))
+        inverse = INVERSE[t]
+        return [(transformBoard(entry[DIRECTIONS[t][d]][0], inverse),
+                 entry[DIRECTIONS[t][d]][1]) for d in range(4)]
+
+    def move(self, board, direction):
+        """
+        This function returns (new board, gained score) of a bitboard moved
+        in passed direction.
+        """
+        canonical, t = canonicalBoard(board)
+        entry = self.lookup(canonical, lambda key: tuple(
+                    bitboard.move(key, d) for d in range(4)))
+        newBoard, gained = entry[DIRECTIONS[t][direction]]
+        return transformBoard(newBoard, INVERSE[t]), gained
+
+    def moveField(self, field, direction):
+        """
+        This function returns (new field, gained score) of a field (any size)
+        moved in passed direction. The new field is a tuple of row tuples.
+        """
+        canonical, t = canonicalField(field)
+        entry = self.lookup(canonical, lambda key: tuple(
+                    moveField(key, d) for d in range(4)))
+        newField, gained = entry[DIRECTIONS[t][direction]]
+        return transformField(newField, INVERSE[t]), gained
+
+    def stats(self):
+        return {"hitRate":   self.hits / self.lookups if self.lookups else 0.0,
+                "size":      len(self.entries),
+                "evictions": self.evictions}
@@ -0,0 +1,277 @@
+#!/usr/bin/python3
+
+"""
+Start 2048 in a terminal (curses), e.g. on a host without display or via SSH.
+Like the tkinter frontend (ui.py) it drives class Game; tkinter is never
+imported, so it starts within milliseconds.
+
+Direction keys (KEYS_UP, ...) and colours (DEFAULT_DESIGN, mapped to the
+256 terminal colours) are taken from config.py. After a move only fields
+which changed are rewritten, so little has to be sent over slow connections.
+
+    python terminal.py [--size N] [--journal FILE]
+
+Without a terminal (or for debugging) a game can be printed once with
+printGame(game) or Game.show().
+"""
+
+import argparse
+import sys
+
+from config import *
+from game import Game
+
+try:
+    import curses
+except ImportError: # Windows (without package windows-curses)
+    curses = None
+
+# curses names of keys of config.py (Tk key names)
+CURSES_KEYS = {"Up": "KEY_UP", "Right": "KEY_RIGHT", "Down": "KEY_DOWN",
+               "Left": "KEY_LEFT", "Escape": 27, "F11": "KEY_F11",
+               "F8": "KEY_F8"}
+
+CELL_WIDTH  = 7 # characters per field (without space)
+CELL_HEIGHT = 3 # lines per field
+
+
+def colour256(colour):
+    """
+    This function returns the nearest of the 256 terminal colours (colour
+    cube 16..231 or grey ramp 232..255) for a colour "#rrggbb".
+    """
+    rgb    = [int(colour[i:i+2], 16) for i in (1, 3, 5)]
+    levels = [0, 95, 135, 175, 215, 255]
+    cube   = [min(range(6), key=lambda i: abs(levels[i] - value))
+              for value in rgb]
+    grey   = min(23, max(0, (sum(rgb) // 3 - 3) // 10))
+
+    candidates = [(16 + 36*cube[0] + 6*cube[1] + cube[2],
+                   [levels[i] for i in cube]),
+                  (232 + grey, [8 + 10*grey]*3)]
+    return min(candidates, key=lambda candidate: sum(
+        (a - b)**2 for a, b in zip(candidate[1], rgb)))[0]
+
+
+# (fg, bg) per exponent
+DESIGN_256 = [(colour256(fg), colour256(bg)) for exponent, fg, bg in DEFAULT_DESIGN]
+
+
+def exponent(number):
+    """
+    This function returns index of colours of a number (0 for empty fields,
+    numbers beyond the design get its last colours).
+    """
+    return min(max(number, 1).bit_length() - 1, len(DESIGN_256) - 1)
+
+
+def keyCode(keysym):
+    """
+    This function returns the curses key code for a key of config.py or None
+    when the key can't be used in a terminal (e.g. "<Control-s>").
+    """
+    keysym = keysym.strip("<>")
+    if(len(keysym) == 1):
+        return ord(keysym)
+    name = CURSES_KEYS.get(keysym)
+    if(isinstance(name, str)):
+        return getattr(curses, name, None)
+    return name
+
+
+def printGame(game, file=None, colours=None):
+    """
+    This function prints score and field of a game (non-interactive mode).
+    Fields get their colours when output is a terminal.
+    """
+    file = file or sys.stdout
+    if(colours is None):
+        colours = hasattr(file, "isatty") and file.isatty()
+
+    print("Score:", game.score,
+          "Round:", game.round,
+          "HighScore:", game.highscore, file=file)
+    width = len(str(max(max(row) for row in game.field)))
+    for row in game.field:
+        line = []
+        for number in row:
+            if(colours):
+                fg, bg = DESIGN_256[exponent(number)]
+                line.append("\x1b[38;5;%d;48;5;%dm %s \x1b[0m"
+                            % (fg, bg, str(number or "").rjust(width)))
+            else:
+                line.append(str(number or ".").rjust(width))
+        print(" ".join(line), file=file)
+
+
+class TerminalUI:
+    def __init__(self, screen, game):
+        self.screen = screen
+        self.game   = game
+
+        # key code -> direction
+        self.keys = {}
+        for direction, keysyms in enumerate([KEYS_UP, KEYS_RIGHT,
+                                             KEYS_DOWN, KEYS_LEFT]):
+            for keysym in keysyms:
+                code = keyCode(keysym)
+                if(code is not None):
+                    self.keys[code] = direction
+
+        # colour pair i+1 for exponent i, without 256 colours numbers are
+        # shown without colours
+        self.colours = curses.has_colors() and curses.COLORS >= 256
+        if(self.colours):
+            curses.use_default_colors()
+            for i, (fg, bg) in enumerate(DESIGN_256):
+                curses.init_pair(i+1, fg, bg)
+
+        curses.curs_set(0)
+        self.message = ""
+        self.layout()
+
+    def layout(self):
+        """
+        This function chooses size of fields (smaller when terminal is too
+        small) and clears the screen, so everything is drawn again.
+        """
+        lines, columns = self.screen.getmaxyx()
+        size = self.game.size
+        self.cellHeight = CELL_HEIGHT if size*(CELL_HEIGHT+1) + 4 <= lines else 1
+        self.cellWidth  = CELL_WIDTH  if size*(CELL_WIDTH+1)  + 2 <= columns \
+                          else max(4, (columns - 2) // size - 1)
+        self.screen.clear()
+        self.resetRenderedState()
+
+    def resetRenderedState(self):
+        """
+        This function forgets what has been drawn, so next call of show()
+        draws everything.
+        """
+        size = self.game.size
+        self.renderedField  = [[None]*size for y in range(size)]
+        self.renderedStatus = None
+
+        # number of fields drawn by last call of show()
+        self.drawnFields = 0
+
+    def addstr(self, y, x, text, attributes=0):
+        try:
+            self.screen.addstr(y, x, text, attributes)
+        except curses.error: # outside of (too small) terminal
+            pass
+
+    def drawField(self, y, x, number):
+        if(self.colours):
+            attributes = curses.color_pair(exponent(number) + 1)
+            text       = str(number or "")
+        else:
+            attributes = curses.A_BOLD if number else curses.A_DIM
+            text       = str(number or ".")
+        top    = 1 + y * (self.cellHeight + (self.cellHeight > 1))
+        left   = 2 + x * (self.cellWidth + 1)
+        middle = self.cellHeight // 2
+        for line in range(self.cellHeight):
+            content = text if line == middle else ""
+            self.addstr(top + line, left,
+                        content.center(self.cellWidth)[:self.cellWidth],
+                        attributes)
+
+    def show(self):
+        """
+        This function draws fields whose numbers changed since last call and
+        the status line (score, highscore, messages). curses sends only
+        changed characters to the terminal.
+        """
+        drawn = 0
+        for y, row in enumerate(self.game.field):
+            rendered = self.renderedField[y]
+            for x, number in enumerate(row):
+                if(number == rendered[x]): continue
+                self.drawField(y, x, number)
+                rendered[x] = number
+                drawn += 1
+        self.drawnFields = drawn
+
+        finished = self.game.isFinished()
+        status = "Score: %d   Highscore: %d%s" % (
+                 self.game.score, self.game.highscore,
+                 "   Game over!" if finished else "")
+        if((status, self.message) != self.renderedStatus):
+            top = 1 + self.game.size * (self.cellHeight + (self.cellHeight > 1))
+            try:
+                self.screen.move(top, 0)
+                self.screen.clrtobot()
+            except curses.error:
+                pass
+            self.addstr(top, 2, status, curses.A_BOLD)
+            self.addstr(top+1, 2, self.message or
+                        "arrow keys: move   %s: undo   %s: new game   %s: quit"
+                        % (KEYS_UNDO, KEYS_NEW_GAME, KEYS_QUIT_GAME))
+            self.renderedStatus = (status, self.message)
+        self.screen.refresh()
+
+    def confirmAction(self, question):
+        """
+        Critical actions (on a game which is not finished) need to be
+        confirmed with y.
+        """
+        if(self.game.isFinished()): return True
+        self.message = question + " (y/n)"
+        self.show()
+        answer = self.screen.getch()
+        self.message = ""
+        return answer in (ord("y"), ord("Y"))
+
+    def run(self):
+        """
+        Main loop: waits for keys and shows game after every key.
+        """
+        self.show()
+        while(True):
+            key = self.screen.getch()
+            if(key in self.keys):
+                # illegal directions (see Game.legalMoves) change nothing
+                self.game.move(self.keys[key])
+            elif(key == keyCode(KEYS_UNDO)):
+                self.game.undo()
+            elif(key == keyCode(KEYS_NEW_GAME)):
+                if(self.confirmAction("Do you really want to start a new game?")):
+                    self.game.writeHighScore()
+                    self.game.newGame()
+            elif(key == keyCode(KEYS_QUIT_GAME)):
+                if(self.confirmAction("Do you really want to quit?")):
+                    break
+            elif(key == curses.KEY_RESIZE):
+                self.layout()
+            self.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="2048 in a terminal")
+    parser.add_argument("--size", type=int, default=4,
+                        help="number of rows and columns of the board (default: 4)")
+    parser.add_argument("--journal", metavar="FILE",
+                        help="record every move in a journal (see journal.py)")
+    args = parser.parse_args()
+
+    if(curses is None):
+        parser.error("curses is not available (on Windows: pip install windows-curses)")
+    if(args.size < 2):
+        parser.error("board must have at least 2x2 fields")
+
+    journal = None
+    if(args.journal is not None):
+        from journal import Journal
+        journal = Journal(args.journal, boardSize=args.size)
+    game = Game(journal=journal, size=args.size)
+    try:
+        curses.wrapper(lambda screen: TerminalUI(screen, game).run())
+    finally:
+        game.writeHighScore()
+        if(journal is not None):
+            journal.close()
+
+
+if(__name__ == "__main__"):
+    main()
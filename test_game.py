@@ -0,0 +1,279 @@
+#!/usr/bin/python3
+
+"""
+Tests
+This module checks that all engines of class Game play the same games:
+
+ - seeded random games give identical fields, scores and new numbers with
+   the bitboard engine and the generic (NxN) engine, and every move matches
+   a plain list implementation of the rules (3x3 to 6x6)
+ - tiles of 32768 and more: the board switches to 8 bits per field and
+   moves, undo and scores stay correct, bitboard.move refuses to merge two
+   tiles of 32768
+ - snapshots (save/open) and journals (record/replay) give back the same
+   states
+
+    python -m pytest test_game.py  (or: python test_game.py)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import bitboard
+from game import Game
+from journal import Journal, Replay
+from randomstream import RandomStream
+
+SEEDS = [1, 2, 3, 2048]
+
+
+def slideLineReference(line):
+    """
+    This function moves and merges one line (list of numbers) to its start,
+    every tile is merged at most once. It returns new line and score.
+    """
+    numbers = [number for number in line if number]
+    result  = []
+    score   = 0
+    i = 0
+    while(i < len(numbers)):
+        if(i+1 < len(numbers) and numbers[i] == numbers[i+1]):
+            result.append(2*numbers[i])
+            score += 2*numbers[i]
+            i += 2
+        else:
+            result.append(numbers[i])
+            i += 1
+    return result + [0]*(len(line)-len(result)), score
+
+
+def moveReference(field, direction):
+    """
+    This function moves field (list of rows) in direction (0,1,2,3 =
+    N,E,S,W) and returns new field (list of lists) and score.
+    """
+    size  = len(field)
+    new   = [list(row) for row in field]
+    score = 0
+    for i in range(size):
+        if(direction == 0 or direction == 2):
+            line = [field[y][i] for y in range(size)]
+        else:
+            line = list(field[i])
+        if(direction == 1 or direction == 2):
+            line.reverse()
+        line, gained = slideLineReference(line)
+        score += gained
+        if(direction == 1 or direction == 2):
+            line.reverse()
+        for j in range(size):
+            if(direction == 0 or direction == 2):
+                new[j][i] = line[j]
+            else:
+                new[i][j] = line[j]
+    return new, score
+
+
+def asLists(field):
+    return [list(row) for row in field]
+
+
+def playRandomGame(game, seed, moves=None):
+    """
+    This function plays game with random directions (seeded) until it is
+    finished (or passed number of moves is done). It returns list of
+    (direction, field, score, round) after every move.
+    """
+    rng    = RandomStream(seed)
+    states = []
+    while(not game.isFinished() and (moves is None or len(states) < moves)):
+        direction = rng.randrange(4)
+        game.move(direction)
+        states.append((direction, game.field, game.score, game.round))
+    return states
+
+
+class TestEngines(unittest.TestCase):
+    def test_bitboardAndGenericEngineAreIdentical(self):
+        for seed in SEEDS:
+            bitboardGame = Game(useBitboard=True, rng=RandomStream(seed))
+            genericGame  = Game(useBitboard=False, rng=RandomStream(seed))
+            self.assertEqual(bitboardGame.field, genericGame.field)
+            self.assertEqual(playRandomGame(bitboardGame, seed),
+                             playRandomGame(genericGame, seed))
+
+    def test_movesMatchReference(self):
+        for size in [3, 4, 5, 6]:
+            for useBitboard in [False, True]:
+                for seed in SEEDS:
+                    self.checkReference(Game(useBitboard=useBitboard,
+                                             rng=RandomStream(seed),
+                                             size=size), seed)
+
+    def checkReference(self, game, seed):
+        """
+        Every move has to give field and score of moveReference plus one
+        new number (2 or 4) on a field which was empty after moving.
+        """
+        rng = RandomStream(seed)
+        while(not game.isFinished()):
+            direction = rng.randrange(4)
+            before    = asLists(game.field)
+            score     = game.score
+            expected, gained = moveReference(before, direction)
+            moved = game.move(direction)
+            self.assertEqual(moved, expected != before)
+            if(not moved):
+                self.assertEqual(asLists(game.field), before)
+                continue
+            self.assertEqual(game.score, score + gained)
+
+            new = [(y, x) for y, row in enumerate(game.field)
+                   for x, number in enumerate(row)
+                   if number != expected[y][x]]
+            self.assertEqual(len(new), 1)
+            y, x = new[0]
+            self.assertEqual(expected[y][x], 0)
+            self.assertIn(game.getNumber(y, x), (2, 4))
+
+    def test_undoRestoresStates(self):
+        for useBitboard in [False, True]:
+            game   = Game(useBitboard=useBitboard, rng=RandomStream(7))
+            states = [(game.field, game.score, game.round)]
+            for direction, field, score, round in playRandomGame(game, 7, 60):
+                if(states[-1][2] != round):
+                    states.append((field, score, round))
+            states.pop()
+            while(game.undo()):
+                self.assertEqual((game.field, game.score, game.round),
+                                 states.pop())
+            self.assertEqual(states, [])
+
+
+class TestLargeTiles(unittest.TestCase):
+    FIELD = [[16384, 16384,     0, 0],
+             [16384, 16384,     2, 0],
+             [    0,     0,     0, 0],
+             [    0,     0,     0, 0]]
+
+    def test_mergeTo32768And65536(self):
+        games = [Game(useBitboard=useBitboard, rng=RandomStream(5))
+                 for useBitboard in [False, True]]
+        for game in games:
+            game.setField(self.FIELD)
+            self.moveLikeReference(game, 3) # west: two tiles of 32768
+            self.assertEqual(game.cellBits, 8)
+            self.assertEqual(game.field[0][0], 32768)
+            self.assertEqual(game.field[1][0], 32768)
+            self.moveLikeReference(game, 0) # north: 65536
+            self.assertEqual(game.field[0][0], 65536)
+        self.assertEqual(games[0].field, games[1].field)
+        self.assertEqual(games[0].score, games[1].score)
+
+        # undo repacks history to 8 bits per field as well
+        for game in games:
+            game.undo()
+            game.undo()
+            self.assertEqual(asLists(game.field), self.FIELD)
+            self.assertEqual(game.score, 0)
+
+    def moveLikeReference(self, game, direction):
+        expected, gained = moveReference(game.field, direction)
+        score = game.score
+        self.assertTrue(game.move(direction))
+        self.assertEqual(game.score, score + gained)
+        self.assertEqual(sum(map(sum, game.field)) - sum(map(sum, expected)),
+                         max(game.getNumber(y, x) for y in range(4)
+                             for x in range(4) if not expected[y][x]))
+
+    def test_setFieldWithLargeTiles(self):
+        game = Game(useBitboard=True, rng=RandomStream(5))
+        field = [[65536, 32768, 0, 0]] + [[0]*4 for i in range(3)]
+        game.setField(field)
+        self.assertEqual(game.cellBits, 8)
+        self.assertEqual(asLists(game.field), field)
+        self.assertTrue(game.move(1))
+        self.assertEqual(game.field[0][2:], (65536, 32768))
+
+    def test_bitboardRejectsMergeOf32768(self):
+        board = bitboard.MAX_EXPONENT | bitboard.MAX_EXPONENT << 4
+        for direction in [1, 3]:
+            with self.assertRaises(OverflowError):
+                bitboard.move(board, direction)
+        self.assertEqual(bitboard.move(board, 0), (board, 0))
+        with self.assertRaises(OverflowError):
+            bitboard.fromField([[32768, 0, 0, 0]] + [[0]*4]*3)
+
+
+class TestFiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_snapshotRoundTrip(self):
+        filename = os.path.join(self.directory, "games.bin")
+        for size in [4, 5]:
+            path  = filename + str(size)
+            game  = Game(useBitboard=True, rng=RandomStream(11), size=size)
+            saved = []
+            for i in range(3):
+                playRandomGame(game, i, 40)
+                game.probability4 = 10 + i
+                saved.append((game.field, game.score, game.round,
+                              game.probability4))
+                self.assertEqual(game.saveGame(path), i)
+            following = playRandomGame(game, 99, 20)
+
+            opened = Game(useBitboard=True, rng=RandomStream(0), size=size)
+            for i, state in enumerate(saved):
+                opened.openGame(path, i)
+                self.assertEqual((opened.field, opened.score, opened.round,
+                                  opened.probability4), state)
+            # state of random number generator is restored as well
+            self.assertEqual(playRandomGame(opened, 99, 20), following)
+
+    def test_journalRoundTrip(self):
+        for size in [4, 5]:
+            filename = os.path.join(self.directory, "game%d.journal" % size)
+            journal  = Journal(filename, keyframeInterval=16, boardSize=size)
+            game     = Game(useBitboard=True, journal=journal,
+                            rng=RandomStream(3), size=size)
+            states   = [(game.field, game.score, game.round)]
+            finished = []
+            for seed in [1, 2]:
+                for direction, field, score, round in playRandomGame(game,
+                                                                     seed, 50):
+                    if(states[-1][2] != round):
+                        states.append((field, score, round))
+                game.undo()
+                states.append((game.field, game.score, game.round))
+                finished.append(states[-1])
+                game.newGame()
+                states.append((game.field, game.score, game.round))
+            finished.append(states[-1])
+            journal.close()
+
+            with Replay(filename) as replay:
+                self.assertEqual(len(replay), len(states))
+                replayed = [(field, score, round) for step, field, score, round
+                            in replay.states()]
+                self.assertEqual(replayed, states)
+                for step in [1, 2, 17, 40, len(states)]:
+                    field, score, round = replay.stateAt(step)
+                    self.assertEqual((tuple(map(tuple, field)), score, round),
+                                     states[step-1])
+                with self.assertRaises(IndexError):
+                    replay.stateAt(0)
+                with self.assertRaises(IndexError):
+                    replay.stateAt(len(states)+1)
+                self.assertEqual([(tuple(map(tuple, field)), score, round)
+                                  for field, score, round in replay.games()],
+                                 finished)
+
+
+if(__name__ == "__main__"):
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+
+"""
+Trainer
+This script trains an n-tuple network (see ntuple.py) by playing games with
+it (TD(0) learning of afterstate values): after every move the value of the
+previous afterstate is moved towards reward plus value of the next
+afterstate. Games are played with Game.move, so numbers are inserted like in
+the real game.
+
+Weights are saved every --checkpoint games (atomically, so the weight file
+can be used by other processes, e.g. runner.py --policy ntuple, while
+training is running). Progress is reported every --report games:
+
+    games   1000  games/s  5.1  average score  8412  2048 reached  1.2%
+
+    python trainer.py [--games 10000] [--weights FILE] [--network small]
+                      [--alpha 0.0025] [--seed 1] [--resume]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import bitboard
+from game import Game
+from ntuple import NTupleNetwork, NETWORKS, FILENAME_WEIGHTS
+from randomstream import RandomStream
+
+ALPHA = 0.0025 # learning rate per weight
+
+
+def trainGame(network, game, alpha=ALPHA):
+    """
+    This function plays one game (game has to be new) and updates weights
+    of network after every move. Games with tiles too large for a bitboard
+    end early.
+    """
+    previous = None # features of previous afterstate
+    while(True):
+        try:
+            board = bitboard.fromField(game.field)
+        except OverflowError:
+            break
+        best = network.bestAfterstate(board)
+        if(best is None): break
+
+        value, direction, afterstate, reward, features = best
+        if(previous is not None):
+            network.update(previous, alpha * (value - network.value(previous)))
+        game.move(direction)
+        previous = features
+
+    # value after end of game is 0
+    if(previous is not None):
+        network.update(previous, -alpha * network.value(previous))
+
+
+def train(network, games, alpha=ALPHA, seed=None, weights=None,
+          checkpoint=1000, report=100, output=sys.stdout):
+    """
+    This function trains network with passed number of games, saves it
+    every checkpoint games and reports progress every report games.
+    """
+    rng  = RandomStream(seed)
+    game = Game(useBitboard=True, rng=RandomStream(rng.next64()))
+
+    start    = time.perf_counter()
+    last     = start
+    scores   = []
+    reached  = 0
+    for i in range(1, games+1):
+        game.rng = RandomStream(rng.next64())
+        game.newGame()
+        trainGame(network, game, alpha)
+
+        scores.append(game.score)
+        if(max(max(row) for row in game.field) >= 2048): reached += 1
+
+        if(i % report == 0 or i == games):
+            now = time.perf_counter()
+            print("games %6d  games/s %6.1f  average score %7d  2048 reached %5.1f%%"
+                  % (i, len(scores) / (now - last), sum(scores) / len(scores),
+                     100 * reached / len(scores)), file=output, flush=True)
+            last    = now
+            scores  = []
+            reached = 0
+        if(weights and (i % checkpoint == 0 or i == games)):
+            network.save(weights)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train an n-tuple network.")
+    parser.add_argument("--games",   type=int, default=10000)
+    parser.add_argument("--weights", default=FILENAME_WEIGHTS,
+                        help="weight file (default: %s)" % FILENAME_WEIGHTS)
+    parser.add_argument("--network", choices=sorted(NETWORKS), default="small")
+    parser.add_argument("--alpha",   type=float, default=ALPHA)
+    parser.add_argument("--seed",    type=int, default=None)
+    parser.add_argument("--checkpoint", type=int, default=1000,
+                        help="save weights every n games")
+    parser.add_argument("--report",  type=int, default=100,
+                        help="report progress every n games")
+    parser.add_argument("--resume",  action="store_true",
+                        help="continue training with weights from file")
+    args = parser.parse_args()
+
+    if(args.resume and os.path.exists(args.weights)):
+        network = NTupleNetwork.open(args.weights, writable=True)
+    else:
+        network = NTupleNetwork(NETWORKS[args.network])
+    bitboard.buildTables()
+
+    train(network, args.games, args.alpha, args.seed, args.weights,
+          args.checkpoint, args.report)
+
+
+if(__name__ == "__main__"):
+    main()
@@ -0,0 +1,698 @@
+from tkinter import *
+from tkinter import messagebox
+from tkinter import filedialog
+from tkinter.font import Font
+from collections import deque
+from math import log2
+
+from config import *
+from game import Game, FILENAME_SAVEGAME
+import os
+import profiling
+import time
+
+"""
+Class UI
+This class implements the frontend using tkinter.
+"""
+class UI:
+    def __init__(self, canvas=False, journal=None, size=4):
+        # board of size x size fields, grid of window depends on it
+        self.size         = size
+        self.gridColumns  = gridColumns(size)
+        self.gridRows     = gridRows(size)
+        self.defaultWidth = self.gridColumns * GRID_UNIT
+
+        # draw board on one canvas with animations (see canvasboard.py)
+        # instead of one label per field
+        self.useCanvas = canvas
+        self.board     = None
+
+        # direction of last move (used for animations)
+        self.lastDirection = None
+
+        # set keys
+        self.keys = [KEYS_UP, KEYS_RIGHT,
+                     KEYS_DOWN, KEYS_LEFT]
+
+        # set colours for tiles: [ [exponent, fg, bg], ... ]
+        self.colours     = DEFAULT_DESIGN
+
+        # colours and fonts
+        self.bg          = BG
+        self.bgEndOfGame = BG_END_OF_GAME
+        self.fontFields  = FONT_FIELD
+        self.fontText    = FONT_TEXT
+        self.font2048    = FONT_2048
+        self.fg2048      = FG_2048
+
+        # create a game instance (optionally recording into a journal file)
+        if(journal is not None):
+            from journal import Journal
+            journal = Journal(journal, boardSize=size)
+        self.game = Game(journal=journal, size=size)
+
+        # create window
+        self.root = Tk()
+        self.root.config(bg=self.bg)
+        self.root.title("2048")
+
+        # measure redraws as well when profiling is switched on
+        if(profiling.active is not None):
+            profiling.active.instrument(self.root, ["update"], "Tk")
+
+        # init grid
+        self.unit   = GRID_UNIT
+        self.width = 0
+        self.height = 0
+
+        # screen size does not change while running, so get it only once
+        self.screenWidth  = self.root.winfo_screenwidth()
+        self.screenHeight = self.root.winfo_screenheight()
+        self.maxUnit      = min(self.screenHeight//self.gridRows-2,
+                                self.screenWidth//self.gridColumns)
+
+        # font objects per unit size: unit -> (fields, text, 2048)
+        self.fonts    = {}
+        self.fontUnit = None
+
+        # resize events are collected and processed at most once per frame
+        self.pendingResize = []
+        self.resizeJob     = None
+
+        # hints and autoplay: searches run on a background worker (created
+        # on first use), its results are polled with root.after()
+        self.worker   = None
+        self.pollJob  = None
+        self.autoplay = False
+        self.hint     = None
+
+        # key presses are buffered and applied to the game at once when Tk
+        # is idle (all key events which arrived together), the window is
+        # redrawn on a fixed-rate tick (at most once per frame) with latest
+        # state, so redraws never delay input
+        self.inputQueue   = deque() # (direction, time of key press)
+        self.inputJob     = None
+        self.pendingInput = []      # times of key presses not shown yet
+        self.showJob      = None
+        self.lastFrame    = 0
+
+        # time from key press until its move is shown (nanoseconds)
+        self.inputLatency = profiling.Histogram()
+        if(profiling.active is not None):
+            profiling.active.histograms["UI input->display"] = self.inputLatency
+
+        # get coefficient for fonts (dependency between font size and grid unit)
+        self.coefficientFontFields = int(self.fontFields[1]) / self.unit
+        self.coefficientFontText   = int(self.fontText[1])   / self.unit
+        self.coefficientFont2048   = int(self.font2048[1])   / self.unit
+
+        # last rendered state (show() only updates widgets which changed)
+        self.resetRenderedState()
+
+        # initialize window
+        self.createUIElements()
+        self.setWindowSize()
+        self.show()
+
+        # bindings
+        self.root.bind("<Enter>",     lambda event: self.scheduleResize(
+                                          self.adjustWindowToCurrentWidth))
+        self.root.bind("<Configure>", lambda event: self.scheduleResize(
+                                          self.adjustWindowToCurrentState))
+        self.root.bind("<Key>",       self.keyPressed)
+
+        # keyboard shortcuts
+        self.root.bind(KEYS_QUIT_GAME,        self.rootDestroy)
+        self.root.bind(KEYS_NEW_GAME,         self.newGame)
+        self.root.bind(KEYS_OPEN_GAME,        self.openGame)
+        self.root.bind(KEYS_SAVE_GAME,        self.saveGame)
+        self.root.bind(KEYS_UNDO,             self.undo)
+        self.root.bind(KEYS_ZOOM_IN,          self.zoomIn)
+        self.root.bind(KEYS_ZOOM_OUT,         self.zoomOut)
+        self.root.bind(KEYS_ENTER_FULLSCREEN, self.enterFullscreen)
+        self.root.bind(KEYS_EXIT_FULLSCREEN,  self.exitFullscreen)
+        self.root.bind(KEYS_HINT,             self.showHint)
+        self.root.bind(KEYS_AUTOPLAY,         self.toggleAutoplay)
+        if(profiling.active is not None):
+            self.root.bind(KEYS_DUMP_PROFILE, self.dumpProfile)
+
+        # call function to close gracefully
+        self.root.protocol("WM_DELETE_WINDOW", self.rootDestroy)
+
+        self.root.mainloop()
+
+    def scheduleResize(self, function):
+        """
+        Resize events come in bursts (e.g. while window is dragged). Instead
+        of handling every event, passed function is remembered and called
+        once when the burst is over (at most once per RESIZE_DELAY).
+        """
+        if(function not in self.pendingResize):
+            self.pendingResize.append(function)
+        if(self.resizeJob is None):
+            self.resizeJob = self.root.after(RESIZE_DELAY, self.processResize)
+
+    def processResize(self):
+        """
+        This function calls all resize functions collected since last frame.
+        """
+        self.resizeJob = None
+        functions, self.pendingResize = self.pendingResize, []
+        for function in functions:
+            function()
+
+    def adjustWindowToCurrentState(self, event=None):
+        """
+        When state of window changes (normal <-> zoomed) the content has to
+        be adjusted. Either default width or maximum width.
+        """
+        state = self.root.state()
+        # zoomed to normal
+        if(self.unit == self.maxUnit and state == "normal"):
+            width = self.defaultWidth
+            self.setWindowSize(width)
+        # normal to zoomed
+        if(self.unit != self.maxUnit and state == "zoomed"):
+            width = self.screenWidth
+            self.setWindowSize(width)
+
+    def adjustWindowToCurrentWidth(self, event=None):
+        """
+        After the user changed the window size, the window will be resized
+        to new width (which includes size of content). The size of the
+        window will not really change but the size of content.
+        """
+        width = self.root.winfo_width()
+        self.setWindowSize(width)
+
+    def setWindowSize(self, width=None):
+        """
+        This function resizes the window. Depending on parameter "width" the
+        size of a unit (in grid) is calculated. One unit should be at least
+        5 pixels (which is actually very small, but must not be larger than
+        possible. That means a maximum value for one unit is calculated
+        depending on screen size and grid size. (Also some space for task bar
+        should be available)
+        When maximum unit size is reached the window will automatically switch
+        to full screen (zoomed state).
+        When window size has to be changed, also all elements in UI have to be
+        adjusted.
+        """
+        if(width is None): width = self.defaultWidth
+
+        # calculate unit, width and height
+        self.unit = min(max(5, width // self.gridColumns), self.maxUnit)
+        width  = self.gridColumns * self.unit
+        height = self.gridRows    * self.unit
+
+        # set state of window (zoomed/normal), max value -> full screen
+        state = "zoomed" if self.unit == self.maxUnit else "normal"
+        if(self.root.state() != state):
+            self.root.state(state)
+
+        # update window (also UI-elements if changed), elements are moved
+        # to their new position (no need to hide them before)
+        if(width != self.width or height != self.height):
+            size = str(width) + "x" + str(height)
+            self.root.geometry(size)
+            self.width  = width
+            self.height = height
+            self.showUIElements()
+
+    def labelField(self):
+        """
+        Factory method to create a field/tile containing the numbers.
+        """
+        return Label(self.root,
+                     text   = "",
+                     anchor = CENTER,
+                     font   = self.fontFields)
+
+    def labelText(self, text=""):
+        """
+        Factory method to create a text label.
+        """
+        return Label(self.root,
+                     text = text,
+                     bg   = self.bg,
+                     font = self.fontText,
+                     fg   = "#ffffff")
+
+    def getFonts(self, unit):
+        """
+        This function returns font objects (fields, text, 2048) for passed
+        size of grid unit. Fonts are created once per unit and reused.
+        """
+        fonts = self.fonts.get(unit)
+        if(fonts is None):
+            fonts = tuple(Font(root   = self.root,
+                               family = font[0],
+                               size   = int(coefficient * unit),
+                               weight = font[2] if len(font) > 2 else "normal")
+                          for font, coefficient in
+                          [(self.fontFields, self.coefficientFontFields),
+                           (self.fontText,   self.coefficientFontText),
+                           (self.font2048,   self.coefficientFont2048)])
+            self.fonts[unit] = fonts
+        return fonts
+
+    def updateFontSize(self):
+        """
+        This function updates all font sizes (depending on new size of grid unit)
+        and labels. Nothing is done when unit did not change.
+        """
+        if(self.fontUnit == self.unit): return
+        self.fontUnit = self.unit
+
+        self.fontFields[1] = int(self.coefficientFontFields * self.unit)
+        self.fontText[1]   = int(self.coefficientFontText   * self.unit)
+        self.font2048[1]   = int(self.coefficientFont2048   * self.unit)
+        fontFields, fontText, font2048 = self.getFonts(self.unit)
+
+        for label in self.listLabels:
+            label.config(font=fontText)
+
+        self.label2048.config(font=font2048)
+
+        for fields in self.field:
+            for field in fields:
+                field.config(font=fontFields)
+
+        if(self.board is not None):
+            self.board.setFont(fontFields)
+
+    def showUIElements(self):
+        """
+        Labels and number fields are placed at their posiiton depending on grid.
+        Afterwards fonts and content will be updated.
+        """
+        for i in range(4):
+            self.listLabels[i].place(x = (6*self.size+2)*self.unit,
+                                     y = (6*i+1)*self.unit,
+                                     width  =  9*self.unit,
+                                     height =  5*self.unit)
+                
+        for y in range(len(self.field)):
+            for x in range(self.size):
+                self.field[y][x].place(x= 6*self.unit*x+self.unit,
+                                       y= 6*self.unit*y+self.unit,
+                                       width  = 5*self.unit,
+                                       height = 5*self.unit)
+
+        if(self.board is not None):
+            self.board.place(self.unit, self.unit, self.unit)
+
+        self.updateFontSize()
+        self.show()
+
+    def createUIElements(self):
+        """
+        This function creates all number fields and labels and sets up general
+        settings for these (text, fonts, colours, bindings).
+        """
+        self.labelScore     = self.labelText()
+        self.labelHighScore = self.labelText()
+        
+        self.label2048 = Label(self.root,
+                               text = "2048",
+                               bg   = self.bg,
+                               font = self.font2048,
+                               fg   = self.fg2048)
+
+        self.labelNewGame = self.labelText("New Game")
+        self.labelNewGame.config(relief=RIDGE)
+        self.labelNewGame.bind("<Button-1>", self.newGame)
+
+        self.listLabels = [self.labelScore,
+                           self.labelHighScore,
+                           self.label2048,
+                           self.labelNewGame]
+        
+        # elements which get end of game background
+        self.listBackground = [self.root] + self.listLabels
+
+        if(self.useCanvas):
+            from canvasboard import CanvasBoard
+            self.board = CanvasBoard(self.root, self.colours, self.bg,
+                                     self.size)
+            self.listBackground.append(self.board.canvas)
+            self.field = []
+        else:
+            # one label per field: self.field[y][x]
+            self.field = [[self.labelField() for x in range(self.size)]
+                          for y in range(self.size)]
+        
+        self.showUIElements()
+
+    def confirmAction(self, msgboxHeading, msgboxText):
+        """
+        Critical actions need to be confirmed. This functions creates a
+        message box to ask the user whether he is sure to continue.
+        This will only happen if game is not finished, otherwise the action
+        can continue (because a finished game is not supposed to be critical).
+        """
+        if(not self.game.isFinished()):
+            # game is not finished yet
+            answer = messagebox.askyesno(msgboxHeading,
+                                         msgboxText)
+            return answer
+
+        # return True per default when game is finished
+        return True
+
+    def rootDestroy(self, event=None):
+        """
+        This functions closes the window gracefully when confirmed again.
+        """
+        if(self.confirmAction("Quit?","Do you really want to quit?")):
+            self.game.writeHighScore()
+            if(self.game.journal is not None):
+                self.game.journal.close()
+            if(self.worker is not None):
+                self.worker.close()
+            self.root.destroy()
+
+    def newGame(self, event=None):
+        """
+        After confirming this action, old game will be saved and a new game
+        will be created. Afterwards UI has to be updated.
+        """
+        if(self.confirmAction("New Game?",
+                              "Do you really want to start a new game?")):
+            self.game.writeHighScore()
+            self.game.newGame()
+            self.stateChanged()
+            self.show()
+
+    def openGame(self, event=None):
+        """
+        After confirming this action, the user chooses a snapshot file and the
+        last game saved in it will be loaded (old game will be saved before).
+        Afterwards UI has to be updated.
+        """
+        if(not self.confirmAction("Open Game?",
+                                  "Do you really want to open another game?")):
+            return
+        filename = filedialog.askopenfilename(
+            title       = "Open Game",
+            initialdir  = os.path.dirname(self.game.filename),
+            initialfile = FILENAME_SAVEGAME,
+            filetypes   = [("2048 games", "*.bin"), ("All files", "*")])
+        if(not filename): return
+
+        self.game.writeHighScore()
+        try:
+            self.game.openGame(filename)
+        except (OSError, ValueError, IndexError) as e:
+            messagebox.showerror("Open Game", "Can't open game:\n" + str(e))
+            return
+        self.lastDirection = None
+        self.stateChanged()
+        self.show()
+
+    def saveGame(self, event=None):
+        """
+        The user chooses a file and a snapshot of current game will be
+        appended to it (one file can hold many games).
+        """
+        filename = filedialog.asksaveasfilename(
+            title            = "Save Game",
+            initialdir       = os.path.dirname(self.game.filename),
+            initialfile      = FILENAME_SAVEGAME,
+            defaultextension = ".bin",
+            confirmoverwrite = False,
+            filetypes        = [("2048 games", "*.bin"), ("All files", "*")])
+        if(not filename): return
+
+        try:
+            self.game.saveGame(filename)
+        except OSError as e:
+            messagebox.showerror("Save Game", "Can't save game:\n" + str(e))
+
+    def undo(self, event=None):
+        """
+        This function takes back the last move.
+        """
+        if(self.game.undo()):
+            self.lastDirection = None
+            self.stateChanged()
+            self.show()
+
+    def zoomIn(self, event=None):
+        """
+        This function will increment grid unit to make content larger.
+        """
+        self.setWindowSize(self.width + self.gridColumns)
+
+    def zoomOut(self, event=None):
+        """
+        This function will decrement grid unit to make content smaller.
+        """
+        self.setWindowSize(self.width - self.gridColumns)
+
+    def enterFullscreen(self, event=None):
+        """
+        This function will switch to fullscreen mode
+        """
+        self.root.state("zoomed")
+
+    def exitFullscreen(self, event=None):
+        """
+        This function will switch back to normal mode (default size)
+        """
+        self.root.state("normal")
+
+    def dumpProfile(self, event=None):
+        """
+        This function prints timings measured so far (see profiling.py).
+        """
+        profiling.active.dump()
+
+    def setTitle(self):
+        """
+        This function shows state of autoplay or current hint in the title
+        of the window.
+        """
+        if(self.autoplay):
+            self.root.title("2048 - Autoplay")
+        elif(self.hint is not None):
+            self.root.title("2048 - Hint: " + self.hint)
+        else:
+            self.root.title("2048")
+
+    def startSearch(self, timeLimit=None):
+        """
+        This function requests a search for current field from the background
+        worker (see searchworker.py) and starts polling for its result. The
+        window is never blocked by the search.
+        """
+        if(self.worker is None):
+            from searchworker import SearchWorker
+            self.worker = SearchWorker()
+        self.worker.search(self.game.field, self.game.probability4, timeLimit)
+        if(self.pollJob is None):
+            self.pollJob = self.root.after(SEARCH_POLL_TIME, self.pollSearch)
+
+    def pollSearch(self):
+        """
+        This function is called by root.after() until the result of current
+        search arrived. The result is shown as hint or, during autoplay,
+        played (and next search is started).
+        """
+        self.pollJob = None
+        result = self.worker.poll()
+        if(result is None):
+            self.pollJob = self.root.after(SEARCH_POLL_TIME, self.pollSearch)
+            return
+        direction = result[1]
+
+        if(not self.autoplay):
+            self.hint = DIRECTION_NAMES[direction] if direction is not None \
+                        else "no move"
+            self.setTitle()
+            return
+
+        if(direction is None or not self.game.move(direction)):
+            # game is finished (or can't be searched)
+            self.toggleAutoplay()
+            self.show()
+            return
+        self.startSearch(AUTOPLAY_TIME_LIMIT)
+        self.scheduleShow()
+
+    def stateChanged(self):
+        """
+        After the game changed, running searches are stale: they are cancelled
+        and the hint is removed. Autoplay continues with new state.
+        """
+        if(self.hint is not None):
+            self.hint = None
+            self.setTitle()
+        if(self.worker is None): return
+        self.worker.cancel()
+        if(self.pollJob is not None):
+            self.root.after_cancel(self.pollJob)
+            self.pollJob = None
+        if(self.autoplay):
+            self.startSearch(AUTOPLAY_TIME_LIMIT)
+
+    def showHint(self, event=None):
+        """
+        This function searches for the best move in background and shows it
+        in the title when found.
+        """
+        if(self.autoplay or self.game.isFinished()): return
+        if(self.game.size != 4):
+            self.hint = "only for 4x4"
+            self.setTitle()
+            return
+        self.hint = "searching ..."
+        self.setTitle()
+        self.startSearch()
+
+    def toggleAutoplay(self, event=None):
+        """
+        This function switches autoplay on or off. Autoplay moves as fast as
+        searches allow, the window is redrawn at most once per frame. Search
+        (see solver.py) is only possible on 4x4 boards.
+        """
+        if(not self.autoplay and self.game.size != 4): return
+        self.autoplay = not self.autoplay
+        self.hint     = None
+        self.setTitle()
+        if(self.autoplay):
+            self.startSearch(AUTOPLAY_TIME_LIMIT)
+        else:
+            self.stateChanged()
+
+    def scheduleShow(self):
+        """
+        This function calls show() with next frame instead of immediately.
+        Frames are at least FRAME_TIME apart; all changes in between are
+        shown at once (intermediate states are skipped).
+        """
+        if(self.showJob is None):
+            wait = self.lastFrame + FRAME_TIME*1000000 - time.perf_counter_ns()
+            self.showJob = self.root.after(max(0, wait // 1000000),
+                                           self.showFrame)
+
+    def showFrame(self):
+        self.showJob   = None
+        self.lastFrame = time.perf_counter_ns()
+        self.show()
+
+    def keyPressed(self, event):
+        """
+        When a key is pressed, it will check whether pressed key should
+        trigger a move.
+        Also some additional keys for resize etc. can be processed here.
+        """
+        for direction in range(4):
+            if(event.keysym in self.keys[direction]):
+                self.inputQueue.append((direction, time.perf_counter_ns()))
+                if(self.inputJob is None):
+                    self.inputJob = self.root.after_idle(self.processInput)
+                return
+
+    def processInput(self):
+        """
+        This function applies all buffered key presses to the game (called
+        once when Tk is idle, after all pending key events were queued); the
+        window is redrawn with next frame. When several moves are shown in
+        one frame, they are not animated.
+        """
+        self.inputJob = None
+        moved = False
+        while(self.inputQueue):
+            direction, pressed = self.inputQueue.popleft()
+            # illegal directions (see Game.legalMoves) change nothing
+            if(self.game.move(direction)):
+                self.lastDirection = direction if not self.pendingInput else None
+                self.pendingInput.append(pressed)
+                moved = True
+        if(moved):
+            self.stateChanged()
+            self.scheduleShow()
+
+    def getColours(self, number):
+        """
+        This functions returns a list [exponent, fg, bg] for passed number.
+        Numbers larger than the last colour (possible on large boards) get
+        its colours.
+        """
+        if(number <= 0): number=1
+        ix = int(log2(number))
+        return self.colours[min(ix, len(self.colours)-1)]
+
+    def resetRenderedState(self):
+        """
+        This function forgets what has been rendered, so next call of show()
+        updates all widgets.
+        """
+        self.renderedField     = [[None]*self.size for y in range(self.size)]
+        self.renderedScore     = None
+        self.renderedHighScore = None
+        self.renderedFinished  = None
+
+        # number of widget reconfigurations during last call of show()
+        self.reconfigurations  = 0
+
+    def show(self):
+        """
+        This function updates content and appearence of fields.
+        Also current score and highscore are shown. Depending on current game
+        status (finished or not) the background colour is adjusted.
+        Only widgets whose value changed since last call are reconfigured,
+        their number is stored in self.reconfigurations. Time from key press
+        until now is recorded in self.inputLatency for every shown move.
+        """
+        reconfigurations = 0
+
+        # key presses which are shown by this call
+        shownInput, self.pendingInput = self.pendingInput, []
+
+        if(self.board is not None):
+            # canvas compares with shown field itself
+            self.board.render(self.game.field, self.lastDirection)
+            self.lastDirection = None
+            reconfigurations += self.board.reconfigurations
+
+        field = self.game.field # built from packed board on every access
+        for y in range(len(self.field)):
+            rendered = self.renderedField[y]
+            for x in range(self.size):
+                currentNumber = field[y][x]
+                if(currentNumber == rendered[x]): continue
+                colours = self.getColours(currentNumber)
+                self.field[y][x].config(fg   = colours[1],
+                                        bg   = colours[2],
+                                        text = currentNumber or "")
+                rendered[x] = currentNumber
+                reconfigurations += 1
+
+        if(self.game.score != self.renderedScore):
+            self.labelScore["text"] = "Score:\n" + str(self.game.score)
+            self.renderedScore = self.game.score
+            reconfigurations += 1
+
+        if(self.game.highscore != self.renderedHighScore):
+            self.labelHighScore["text"] = "Highscore:\n" + str(self.game.highscore)
+            self.renderedHighScore = self.game.highscore
+            reconfigurations += 1
+
+        finished = self.game.isFinished()
+        if(finished != self.renderedFinished):
+            bg = self.bgEndOfGame if finished else self.bg
+            for element in self.listBackground:
+                element.config(bg = bg)
+            self.renderedFinished = finished
+            reconfigurations += len(self.listBackground)
+
+        self.reconfigurations = reconfigurations
+
+        # widgets are redrawn by mainloop when idle, no need to block here
+        if(shownInput):
+            now = time.perf_counter_ns()
+            for pressed in shownInput:
+                self.inputLatency.add(now - pressed)